@@ -1,5 +1,26 @@
-from .controller import EEGController
-from .gui import EEGUI
-from .subject import EEGSubjectData
-from .task import EEGTaskData  
-from .visualization import EEGVisualization
\ No newline at end of file
+# Public names resolve on first access (PEP 562), so `import eegkit` stays cheap and a headless
+# worker using only EEGSubjectData never imports matplotlib, ipywidgets or IPython.
+from importlib import import_module
+
+_EXPORTS = {
+    "EEGController": ".controller",
+    "EEGUI": ".gui",
+    "EEGSubjectData": ".subject",
+    "EEGTaskData": ".task",
+    "EEGVisualization": ".visualization",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
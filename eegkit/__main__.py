@@ -0,0 +1,189 @@
+import argparse
+from .index import DatasetIndex
+from .subject import EEGSubjectData
+
+# Each command imports what it runs, so e.g. `eegkit index` never loads mne, matplotlib or boto3.
+
+
+def _precompute(args):
+    from .batch import BatchPrecompute
+    subject_data = EEGSubjectData(args.data_dir, index=args.index or True)
+    keys = subject_data.iter_keys(tasks=set(args.tasks) if args.tasks else None)
+    bands = args.band or [(1.0, 50.0)]
+    runner = BatchPrecompute(args.data_dir, args.out, bands=bands, workers=args.workers, profile=args.profile)
+    summary = runner.run(keys)
+    return 1 if summary["error"] else 0
+
+
+def _features(args):
+    from .features import FeatureExtraction
+    subject_data = EEGSubjectData(args.data_dir, index=args.index or True)
+    keys = subject_data.iter_keys(tasks=set(args.tasks) if args.tasks else None)
+    runner = FeatureExtraction(args.data_dir, args.out, l_freq=args.l_freq, h_freq=args.h_freq, workers=args.workers,
+                               profile=args.profile)
+    summary = runner.run(keys)
+    return 1 if summary["error"] else 0
+
+
+def _render(args):
+    from .rendering import FigureRendering
+    subject_data = EEGSubjectData(args.data_dir, index=args.index or True)
+    keys = subject_data.iter_keys(tasks=set(args.tasks) if args.tasks else None)
+    runner = FigureRendering(args.data_dir, args.out, plots=args.plots, fmt=args.format, dpi=args.dpi,
+                             workers=args.workers, profile=args.profile)
+    summary = runner.run(keys)
+    return 1 if summary["error"] else 0
+
+
+def _report(args):
+    from .report import QCReport, REPORT_PLOTS
+    subject_data = EEGSubjectData(args.data_dir, index=args.index or True)
+    keys = subject_data.iter_keys(tasks=set(args.tasks) if args.tasks else None)
+    report = QCReport(args.data_dir, args.out, plots=args.plots or REPORT_PLOTS, l_freq=args.l_freq, h_freq=args.h_freq,
+                      workers=args.workers, profile=args.profile)
+    summary = report.build(keys, title=args.title)
+    return 1 if summary["error"] or summary["plot_errors"] else 0
+
+
+def _index(args):
+    index = DatasetIndex(args.data_dir, args.index)
+    stats = index.refresh(full=args.full)
+    print(f"{index.path}: {stats['subjects']} subjects, {stats['rescanned']} rescanned, {stats['removed']} removed")
+    return 0
+
+
+def _sync(args):
+    from .sync import S3Sync, HBN_BUCKET, changed_subjects
+    bucket = args.bucket or HBN_BUCKET
+    syncer = S3Sync.hbn_release(args.release, args.data_dir, bucket=bucket, workers=args.workers) \
+        if args.prefix is None else S3Sync(args.prefix, args.data_dir, bucket=bucket, workers=args.workers)
+    manifest = syncer.run()
+    if not args.no_index:
+        index = DatasetIndex(args.data_dir, args.index)
+        stats = index.refresh(subjects=changed_subjects(manifest))
+        print(f"{index.path}: {stats['subjects']} subjects, {stats['rescanned']} rescanned")
+    return 1 if any(f["status"] == "error" for f in manifest["files"]) else 0
+
+
+def _benchmark(args):
+    from .benchmark import generate_dataset, run_benchmark, save_results, load_results, compare, REGRESSION_THRESHOLD
+    threshold = args.threshold if args.threshold is not None else REGRESSION_THRESHOLD
+    if args.generate:
+        generate_dataset(args.data_dir, n_subjects=args.subjects, duration=args.duration, sfreq=args.sfreq)
+    results = run_benchmark(args.data_dir, repeats=args.repeats, plots=args.plots)
+    if args.out:
+        save_results(results, args.out)
+    if args.baseline is None:
+        return 0
+    table = compare(results, load_results(args.baseline), threshold=threshold)
+    print(table.to_string(index=False, float_format="{:.3f}".format))
+    regressions = table[table["regression"]]
+    if not regressions.empty:
+        print(f"{len(regressions)} stage(s) slower than the baseline by more than {threshold:.0%}")
+        return 1
+    return 0
+
+
+def _imports(args):
+    from .benchmark import check_imports, IMPORT_BUDGET_S
+    failures = check_imports(budget_s=args.budget if args.budget is not None else IMPORT_BUDGET_S)
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="eegkit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    precompute = commands.add_parser("precompute", help="filter and epoch a BIDS release to disk")
+    precompute.add_argument("data_dir", help="release directory, e.g. cmi_bids_R1")
+    precompute.add_argument("--out", required=True, help="output directory")
+    precompute.add_argument("--tasks", nargs="+", help="task names (default: all)")
+    precompute.add_argument("--band", nargs=2, type=float, action="append", metavar=("L_FREQ", "H_FREQ"),
+                            help="filter band, repeatable (default: 1 50)")
+    precompute.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    precompute.add_argument("--index", help="dataset index file (default: ~/.cache/eegkit)")
+    precompute.add_argument("--profile", action="store_true", help="write per-stage timings to spans.json/csv")
+    precompute.set_defaults(func=_precompute)
+
+    features = commands.add_parser("features", help="band-power tables for every recording, as Parquet")
+    features.add_argument("data_dir", help="release directory, e.g. cmi_bids_R1")
+    features.add_argument("--out", required=True, help="dataset root (partitioned by release/task)")
+    features.add_argument("--tasks", nargs="+", help="task names (default: all)")
+    features.add_argument("--l-freq", type=float, default=1.0)
+    features.add_argument("--h-freq", type=float, default=50.0)
+    features.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    features.add_argument("--index", help="dataset index file (default: ~/.cache/eegkit)")
+    features.add_argument("--profile", action="store_true", help="write per-stage timings to spans.json/csv")
+    features.set_defaults(func=_features)
+
+    render = commands.add_parser("render", help="pre-render plot specs to a figure cache directory")
+    render.add_argument("data_dir", help="release directory, e.g. cmi_bids_R1")
+    render.add_argument("--out", required=True, help="figure cache directory (FigureRenderer cache_dir)")
+    render.add_argument("--tasks", nargs="+", help="task names (default: all)")
+    render.add_argument("--plots", nargs="+", default=["sensors", "time", "frequency"], help="plot spec names")
+    render.add_argument("--format", default="png", help="png or svg")
+    render.add_argument("--dpi", type=int, default=100)
+    render.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    render.add_argument("--index", help="dataset index file (default: ~/.cache/eegkit)")
+    render.add_argument("--profile", action="store_true", help="write per-stage timings to spans.json/csv")
+    render.set_defaults(func=_render)
+
+    report = commands.add_parser("report", help="static HTML QC report with thumbnails and epoch summaries")
+    report.add_argument("data_dir", help="release directory, e.g. cmi_bids_R1")
+    report.add_argument("--out", required=True, help="report directory (index.html, figures/, thumbs/)")
+    report.add_argument("--tasks", nargs="+", help="task names (default: all)")
+    report.add_argument("--plots", nargs="+", help="plot spec names (default: report.REPORT_PLOTS)")
+    report.add_argument("--l-freq", type=float, default=1.0)
+    report.add_argument("--h-freq", type=float, default=50.0)
+    report.add_argument("--title", help="page title")
+    report.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    report.add_argument("--index", help="dataset index file (default: ~/.cache/eegkit)")
+    report.add_argument("--profile", action="store_true", help="write per-stage timings to spans.json/csv")
+    report.set_defaults(func=_report)
+
+    sync = commands.add_parser("sync", help="download or update a release from S3 (resumable)")
+    sync.add_argument("data_dir", help="local release directory, e.g. cmi_bids_R1")
+    source = sync.add_mutually_exclusive_group(required=True)
+    source.add_argument("--release", type=int, help="HBN release number")
+    source.add_argument("--prefix", help="any S3 prefix to mirror instead")
+    sync.add_argument("--bucket", help="S3 bucket (default: fcp-indi)")
+    sync.add_argument("--workers", type=int, default=16, help="concurrent range requests")
+    sync.add_argument("--index", help="dataset index file to update (default: ~/.cache/eegkit)")
+    sync.add_argument("--no-index", action="store_true", help="do not update the dataset index")
+    sync.set_defaults(func=_sync)
+
+    benchmark = commands.add_parser("benchmark", help="time loading/filtering/epoching/plots, optionally vs a baseline")
+    benchmark.add_argument("data_dir", help="release directory (a synthetic one with --generate)")
+    benchmark.add_argument("--generate", action="store_true", help="first generate a synthetic dataset in data_dir")
+    benchmark.add_argument("--subjects", type=int, default=2, help="synthetic subjects")
+    benchmark.add_argument("--duration", type=float, default=300.0, help="synthetic recording length (s)")
+    benchmark.add_argument("--sfreq", type=float, default=500.0, help="synthetic sampling rate (Hz)")
+    benchmark.add_argument("--repeats", type=int, default=3)
+    benchmark.add_argument("--plots", nargs="+", help="plot spec names (default: all)")
+    benchmark.add_argument("--out", help="write results JSON here")
+    benchmark.add_argument("--baseline", help="results JSON to compare against (exit 1 on regression)")
+    benchmark.add_argument("--threshold", type=float, help="allowed slowdown as a fraction (default: 0.2)")
+    benchmark.set_defaults(func=_benchmark)
+
+    imports = commands.add_parser("imports", help="check import time and that headless imports skip GUI modules")
+    imports.add_argument("--budget", type=float, help="seconds allowed per import (default: benchmark.IMPORT_BUDGET_S)")
+    imports.set_defaults(func=_imports)
+
+    index = commands.add_parser("index", help="build or refresh the dataset index of a release")
+    index.add_argument("data_dir", help="release directory, e.g. cmi_bids_R1")
+    index.add_argument("--index", help="index file (default: ~/.cache/eegkit)")
+    index.add_argument("--full", action="store_true", help="rescan every subject, not only changed ones")
+    index.set_defaults(func=_index)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+import json
+import os
+import sys
+import time
+import traceback
+import numpy as np
+from . import profiling
+
+
+def key_stem(subject, task, run=None):
+    stem = f"{subject}_task-{task}"
+    if run:
+        stem += f"_run-{run}"
+    return stem
+
+
+def _write_json(path, payload):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _save_epochs(path, epochs, labels):
+    labels = np.asarray(labels)
+    if labels.dtype == object:
+        labels = labels.astype(str)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            data=epochs.get_data(),
+            labels=labels,
+            events=epochs.events,
+            times=epochs.times,
+            sfreq=epochs.info["sfreq"],
+            ch_names=np.array(epochs.ch_names),
+        )
+    os.replace(tmp, path)
+
+
+def process_key(data_dir, out_dir, subject, task, run, bands):
+    """
+    Epoch one (subject, task, run) for every (l_freq, h_freq) band and write one .npz per band.
+    Runs inside a worker process; the recording is released when this returns.
+    """
+    start = time.perf_counter()
+    subject_dir = Path(out_dir) / subject
+    subject_dir.mkdir(parents=True, exist_ok=True)
+    stem = key_stem(subject, task, run)
+
+    from .task import EEGTaskData  # deferred: importing the runner stays cheap (see benchmark.HEADLESS_IMPORTS)
+    task_data = EEGTaskData(subject=subject, task=task, run=run, data_dir=Path(data_dir))
+    outputs = []
+    for l_freq, h_freq in bands:
+        epochs, labels = task_data.get_epochs(l_freq=l_freq, h_freq=h_freq)
+        if epochs is None:
+            return {"status": "unsupported", "outputs": outputs, "seconds": time.perf_counter() - start}
+        path = subject_dir / f"{stem}_band-{l_freq:g}-{h_freq:g}_epo.npz"
+        _save_epochs(path, epochs, labels)
+        outputs.append({"path": str(path), "l_freq": l_freq, "h_freq": h_freq, "n_epochs": len(epochs)})
+
+    return {"status": "ok", "outputs": outputs, "seconds": time.perf_counter() - start}
+
+
+def _run_one(job, data_dir, out_dir, key, config, profile=False):
+    # Per-item error capture: a failing recording never takes down the whole batch.
+    recorder = None
+    if profile:
+        recorder = profiling.enable()
+        recorder.clear()
+    try:
+        with profiling.span("job", job=job.__name__):
+            result = job(data_dir, out_dir, *key, **config)
+    except Exception as exc:
+        result = {"status": "error", "error": repr(exc), "traceback": traceback.format_exc()}
+    if recorder is not None:
+        result["spans"] = recorder.to_frame().drop(columns=["start"]).to_dict(orient="records")
+    return result
+
+
+def _normalize(config):
+    # Round-trip through JSON so tuples compare equal to the lists read back from status files.
+    return json.loads(json.dumps(config, default=str))
+
+
+class BatchRunner:
+    """
+    Fan (subject, task, run) keys out over a process pool, calling
+    job(data_dir, out_dir, subject, task, run, **config) once per key in a worker.
+    Each finished key leaves <status_dir>/<subject>/<stem>.json; keys with status 'ok' or
+    'unsupported' for the same config are skipped on restart, errored keys are retried.
+    max_tasks_per_child needs Python 3.11 (ProcessPoolExecutor); on older versions it is ignored
+    and workers live for the whole run.
+    """
+
+    def __init__(self, job, data_dir, out_dir, workers=None, status_dir=None, max_tasks_per_child=None, profile=False,
+                 **config):
+        self.job = job
+        self.data_dir = Path(data_dir)
+        self.out_dir = Path(out_dir)
+        self.status_dir = Path(status_dir) if status_dir is not None else self.out_dir
+        self.workers = workers or os.cpu_count()
+        # Recycle each worker process after this many keys, returning whatever it accumulated to the OS.
+        self.max_tasks_per_child = max_tasks_per_child
+        # profile=True: stage spans of every processed key go to <status_dir>/spans.json and spans.csv
+        self.profile = profile
+        self.config = config
+
+    def _status_path(self, subject, task, run):
+        return self.status_dir / subject / f"{key_stem(subject, task, run)}.json"
+
+    def is_done(self, key):
+        path = self._status_path(*key)
+        if not path.exists():
+            return False
+        with open(path) as f:
+            status = json.load(f)
+        return status.get("status") in ("ok", "unsupported") and status.get("config") == _normalize(self.config)
+
+    def _record(self, key, result):
+        path = self._status_path(*key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        subject, task, run = key
+        _write_json(path, {"subject": subject, "task": task, "run": run, "config": self.config, **result})
+
+    def run(self, keys, log=print):
+        keys = list(keys)
+        pending = [k for k in keys if not self.is_done(k)]
+        log(f"{len(keys)} keys, {len(keys) - len(pending)} already done, {len(pending)} to process "
+            f"with {self.workers} workers")
+
+        summary = {"ok": 0, "unsupported": 0, "error": 0}
+        if not pending:
+            return summary
+        spans = []
+
+        def report(i, key, result):
+            subject, task, run = key
+            spans.extend({"subject": subject, "task": task, "run": run, **r} for r in result.pop("spans", []))
+            self._record(key, result)
+            summary[result["status"]] += 1
+            seconds = result.get("seconds")
+            timing = f" ({seconds:.1f}s)" if seconds is not None else ""
+            log(f"[{i}/{len(pending)}] {key_stem(*key)}: {result['status']}{timing}"
+                + (f" — {result['error']}" if result["status"] == "error" else ""))
+
+        args = (self.job, self.data_dir, self.out_dir)
+        if self.workers <= 1:
+            for i, key in enumerate(pending, 1):
+                report(i, key, _run_one(*args, key, self.config, self.profile))
+        else:
+            # Jobs build a fresh EEGTaskData per key, so each worker holds one recording at a time.
+            pool_kwargs = {}
+            if self.max_tasks_per_child and sys.version_info >= (3, 11):
+                pool_kwargs = {"max_tasks_per_child": self.max_tasks_per_child, "mp_context": get_context("spawn")}
+            with ProcessPoolExecutor(max_workers=self.workers, **pool_kwargs) as pool:
+                futures = {pool.submit(_run_one, *args, key, self.config, self.profile): key for key in pending}
+                for i, future in enumerate(as_completed(futures), 1):
+                    try:
+                        result = future.result()
+                    except Exception as exc:  # worker died (e.g. OOM-killed)
+                        result = {"status": "error", "error": repr(exc)}
+                    report(i, futures[future], result)
+
+        if self.profile:
+            self._write_spans(spans, log)
+        log(", ".join(f"{k}: {v}" for k, v in summary.items()))
+        return summary
+
+    def _write_spans(self, spans, log):
+        self.status_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(self.status_dir / "spans.json", spans)
+        import pandas as pd
+        df = pd.DataFrame(spans)
+        df.to_csv(self.status_dir / "spans.csv", index=False)
+        if not df.empty:
+            stats = profiling.span_stats(df)
+            log("Slowest stages (total seconds): "
+                + ", ".join(f"{name} {row.total_s:.1f}" for name, row in stats.head(5).iterrows()))
+
+
+class BatchPrecompute(BatchRunner):
+    """Filter and epoch every key for each band, writing one .npz per band (see process_key)."""
+
+    def __init__(self, data_dir, out_dir, bands=((1, 50),), workers=None, profile=False):
+        bands = [[float(f) for f in band] for band in bands]
+        super().__init__(process_key, data_dir, out_dir, workers=workers, profile=profile, bands=bands)
@@ -0,0 +1,259 @@
+from pathlib import Path
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from .subject import EEGSubjectData
+
+# mne, pandas, scipy and matplotlib are imported by the functions that use them, so the import
+# checks below (and `eegkit imports`) do not load the stack they are checking for.
+
+N_CHANNELS = 128  # E1..E128, plus the Cz reference the loader drops
+BENCHMARK_TASKS = ("RestingState", "surroundSupp")
+REGRESSION_THRESHOLD = 0.20  # a stage regresses when its median is >20% slower than the baseline's
+
+# Import budget: each statement, in a fresh interpreter, must finish within IMPORT_BUDGET_S and
+# must not load any of the GUI/plotting modules listed with it.
+IMPORT_BUDGET_S = 1.0
+HEADLESS_IMPORTS = {
+    "import eegkit": ("mne", "scipy", "matplotlib", "pandas", "ipywidgets", "IPython"),
+    "from eegkit import EEGSubjectData": ("mne", "scipy", "matplotlib", "pandas", "ipywidgets", "IPython"),
+    "from eegkit.batch import BatchPrecompute": ("mne", "scipy", "matplotlib", "pandas", "ipywidgets", "IPython"),
+    "from eegkit.rendering import FigureRenderer": ("matplotlib", "pandas", "ipywidgets", "IPython"),
+}
+
+
+# -- synthetic dataset ----------------------------------------------------------------------------
+
+def _channel_positions():
+    import mne
+    names = [f"E{i}" for i in range(1, N_CHANNELS + 1)] + ["Cz"]
+    ch_pos = mne.channels.make_standard_montage("GSN-HydroCel-128").get_positions()["ch_pos"]
+    positions = np.array([ch_pos.get(name, (np.nan, np.nan, np.nan)) for name in names]) * 100  # m → cm
+    return names, positions
+
+
+def _signal(rng, n_channels, n_times, sfreq, block=2 ** 16):
+    """1/f-like background plus a 10 Hz alpha rhythm, in µV, generated block by block as float32."""
+    t_alpha = 2 * np.pi * 10.0 / sfreq
+    gains = rng.uniform(5, 15, size=(n_channels, 1))
+    for start in range(0, n_times, block):
+        n = min(block, n_times - start)
+        noise = np.cumsum(rng.standard_normal((n_channels, n)), axis=1) * 0.1
+        noise -= noise.mean(axis=1, keepdims=True)
+        alpha = gains * np.sin(t_alpha * np.arange(start, start + n))
+        yield (noise + alpha + rng.standard_normal((n_channels, n)) * 2).astype(np.float32)
+
+
+def _resting_events(duration, sfreq):
+    import pandas as pd
+    rows = [("resting_start", 0.5), ("break cnt", 1.0)]
+    onset, eyes_open = 2.0, True
+    while onset + 21 < duration - 2:
+        rows.append(("instructed_toOpenEyes" if eyes_open else "instructed_toCloseEyes", onset))
+        onset, eyes_open = onset + 21, not eyes_open
+    rows.append(("break cnt", duration - 1.0))
+    return pd.DataFrame([{"onset": t, "duration": 0.0, "value": v, "sample": int(round(t * sfreq))} for v, t in rows])
+
+
+def _surround_events(duration, sfreq, rng):
+    import pandas as pd
+    rows, onset = [], 1.0
+    while onset + 3 < duration:
+        rows.append({"onset": onset, "duration": 0.0, "value": "stim_ON", "sample": int(round(onset * sfreq)),
+                     "background": int(rng.integers(0, 2)), "foreground_contrast": float(rng.choice([0.3, 0.6, 1.0])),
+                     "stimulus_cond": int(rng.integers(1, 4))})
+        rows.append({"onset": onset + 2.4, "duration": 0.0, "value": "stim_OFF",
+                     "sample": int(round((onset + 2.4) * sfreq))})
+        onset += 3.0
+    return pd.DataFrame(rows)
+
+
+def _write_set(set_path, n_times, sfreq, names, positions, events, chunks):
+    """EEGLAB .set header (MATLAB struct fields at top level) + float32 .fdt, as read by read_raw_eeglab."""
+    from scipy.io import savemat
+    fdt_path = set_path.with_suffix(".fdt")
+    with open(fdt_path, "wb") as f:
+        for chunk in chunks:
+            chunk.T.tofile(f)  # .fdt is (channels, times) in Fortran order: time-major float32
+
+    chanlocs = np.zeros(len(names), dtype=[("labels", "O"), ("X", "O"), ("Y", "O"), ("Z", "O"), ("type", "O")])
+    for i, (name, (x, y, z)) in enumerate(zip(names, positions)):
+        # EEGLAB's axes: X towards the nose, Y towards the left ear.
+        chanlocs[i] = (name, y, -x, z, "EEG")
+    event = np.zeros(len(events), dtype=[("type", "O"), ("latency", "O"), ("duration", "O")])
+    for i, (value, onset) in enumerate(zip(events["value"], events["onset"])):
+        event[i] = (value, float(onset * sfreq + 1), 0.0)  # 1-based sample latency
+
+    savemat(set_path, {
+        "setname": set_path.stem, "filename": set_path.name, "filepath": "",
+        "nbchan": float(len(names)), "trials": 1.0, "pnts": float(n_times), "srate": float(sfreq),
+        "xmin": 0.0, "xmax": (n_times - 1) / sfreq, "ref": "common",
+        "data": fdt_path.name, "chanlocs": chanlocs, "event": event,
+        "icawinv": np.array([]), "icasphere": np.array([]), "icaweights": np.array([]),
+    }, appendmat=False, oned_as="row")
+
+
+def generate_dataset(root, n_subjects=2, duration=300.0, sfreq=500.0, tasks=BENCHMARK_TASKS, seed=0):
+    """
+    Offline HBN-style BIDS release under `root`: per subject and task an EEGLAB .set/.fdt pair
+    (128-channel GSN-HydroCel + Cz), events.tsv, eeg.json, channels.tsv and electrodes.tsv.
+    Deterministic for a given seed; existing recordings are left untouched.
+    """
+    import pandas as pd
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    names, positions = _channel_positions()
+    n_times = int(duration * sfreq)
+
+    for i in range(n_subjects):
+        subject = f"sub-NDARBENCH{i:04d}"
+        eeg_dir = root / subject / "eeg"
+        eeg_dir.mkdir(parents=True, exist_ok=True)
+        for task in tasks:
+            stem = f"{subject}_task-{task}"
+            set_path = eeg_dir / f"{stem}_eeg.set"
+            if set_path.exists():
+                continue
+            if task == "RestingState":
+                events = _resting_events(duration, sfreq)
+            elif task == "surroundSupp":
+                events = _surround_events(duration, sfreq, rng)
+            else:
+                raise ValueError(f"no synthetic events for task {task!r}; choose from {BENCHMARK_TASKS}")
+
+            events.to_csv(eeg_dir / f"{stem}_events.tsv", sep="\t", index=False)
+            pd.DataFrame({"name": names, "type": "EEG", "units": "uV"}).to_csv(
+                eeg_dir / f"{stem}_channels.tsv", sep="\t", index=False)
+            pd.DataFrame({"name": names, "x": positions[:, 0], "y": positions[:, 1], "z": positions[:, 2]}).to_csv(
+                eeg_dir / f"{stem}_electrodes.tsv", sep="\t", index=False, na_rep="n/a")
+            with open(eeg_dir / f"{stem}_eeg.json", "w") as f:
+                json.dump({"TaskName": task, "SamplingFrequency": sfreq, "EEGChannelCount": len(names),
+                           "EEGReference": "Cz", "RecordingDuration": duration}, f, indent=2)
+            _write_set(set_path, n_times, sfreq, names, positions, events,
+                       _signal(rng, len(names), n_times, sfreq))
+    return root
+
+
+# -- imports --------------------------------------------------------------------------------------
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure_import(statement):
+    """Wall time of `statement` in a fresh interpreter, and the top-level packages it loaded."""
+    output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE, statement], check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    return result["seconds"], {name.split(".")[0] for name in result["modules"]}
+
+
+def check_imports(budget_s=IMPORT_BUDGET_S, imports=HEADLESS_IMPORTS):
+    """Failure messages (empty when all pass) for imports over budget or loading forbidden packages."""
+    failures = []
+    for statement, forbidden in imports.items():
+        seconds, packages = measure_import(statement)
+        loaded = sorted(set(forbidden) & packages)
+        if loaded:
+            failures.append(f"{statement!r} imported {', '.join(loaded)}")
+        if seconds > budget_s:
+            failures.append(f"{statement!r} took {seconds:.2f}s (budget {budget_s:.2f}s)")
+    return failures
+
+
+# -- timing ---------------------------------------------------------------------------------------
+
+def _summary(runs):
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "runs": runs}
+
+
+def _time(fn, repeats):
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return _summary(runs)
+
+
+def run_benchmark(data_dir, repeats=3, l_freq=1.0, h_freq=50.0, plots=None, log=print):
+    """
+    Cold-cache timings on the first recording of each task: EEGSubjectData init, get_task,
+    get_filtered_raw, get_epochs and one headless render per plot spec. Every repeat starts from a
+    fresh EEGSubjectData, so nothing is served from the in-memory cache.
+    """
+    import matplotlib.pyplot as plt
+    import mne
+    from .rendering import FigureRenderer
+    from .visualization import EEGVisualization
+    plt.switch_backend("Agg")
+    data_dir = Path(data_dir)
+    stages = {}
+    for statement in HEADLESS_IMPORTS:
+        stages[f"import:{statement}"] = _summary([measure_import(statement)[0] for _ in range(repeats)])
+    stages["subject_init"] = _time(lambda: EEGSubjectData(data_dir), repeats)
+    subject_data = EEGSubjectData(data_dir)
+    seen = {}
+    for subject, task, run in subject_data.iter_keys():
+        seen.setdefault(task, (subject, task, run))
+
+    for task, key in sorted(seen.items()):
+        fresh = lambda: EEGSubjectData(data_dir)
+        stages[f"{task}/get_task"] = _time(lambda: fresh().get_task(*key), repeats)
+        stages[f"{task}/get_filtered_raw"] = _time(
+            lambda: fresh().get_task(*key).get_filtered_raw(l_freq, h_freq), repeats)
+        stages[f"{task}/get_epochs"] = _time(lambda: fresh().get_task(*key).get_epochs(l_freq, h_freq), repeats)
+
+        for plot_type in plots or list(EEGVisualization(subject_data).plot_specs):
+            def render():
+                renderer = FigureRenderer(EEGVisualization(fresh()))
+                renderer.render(*key, plot_type, l_freq=l_freq, h_freq=h_freq)
+            stages[f"{task}/plot:{plot_type}"] = _time(render, repeats)
+        log(f"{task}: " + ", ".join(f"{name.split('/', 1)[1]} {r['median_s']:.2f}s"
+                                      for name, r in stages.items() if name.startswith(f"{task}/")))
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "data_dir": str(data_dir),
+        "repeats": repeats,
+        "environment": {"python": platform.python_version(), "mne": mne.__version__, "numpy": np.__version__,
+                        "machine": platform.machine(), "cpus": os.cpu_count()},
+        "stages": stages,
+    }
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Stage-by-stage medians against a baseline run. `regression` is True where the new median
+    exceeds the baseline's by more than `threshold` (a fraction); stages missing from either side
+    are listed with NaN.
+    """
+    import pandas as pd
+    names = sorted(set(results["stages"]) | set(baseline["stages"]))
+    rows = []
+    for name in names:
+        new = results["stages"].get(name, {}).get("median_s", np.nan)
+        old = baseline["stages"].get(name, {}).get("median_s", np.nan)
+        ratio = new / old if old else np.nan
+        rows.append({"stage": name, "baseline_s": old, "median_s": new, "ratio": ratio,
+                     "regression": bool(ratio > 1 + threshold)})
+    return pd.DataFrame(rows)
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+from threading import RLock
+import numpy as np
+
+
+def nbytes_of(value):
+    """
+    Best-effort resident size of a cached value in bytes.
+    Handles arrays, bytes, preloaded MNE Raw/Epochs, EEGTaskData and tuples, lists and dict
+    values of those (e.g. SpectralEngine's {condition: SpectrumArray}).
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes_of(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes_of(v) for v in value.values())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.memmap) and value._mmap is not None:
+        return 0  # file-backed pages are shared page cache, not private memory
+    size = getattr(value, "nbytes", None)
+    if isinstance(size, int):
+        return size
+    data = getattr(value, "_data", None)
+    if data is not None and hasattr(data, "nbytes"):
+        return nbytes_of(data)
+    return 0
+
+
+def freeze(value):
+    """
+    Mark the arrays of a cached value read-only, so an in-place write (raw.filter, apply_baseline,
+    ...) on a shared object raises instead of silently corrupting every later reader.
+    Callers that need to modify cached data work on .copy(), whose arrays are writable again.
+    """
+    if isinstance(value, (tuple, list)):
+        for v in value:
+            freeze(v)
+    elif isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    else:
+        data = getattr(value, "_data", None)
+        if isinstance(data, np.ndarray):
+            data.flags.writeable = False
+    return value
+
+
+class LRUCache:
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self.evict()
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def pop_prefix(self, prefix):
+        """Drop every tuple key starting with `prefix` (e.g. all entries of one recording); returns how many."""
+        n = len(prefix)
+        with self._lock:
+            keys = [k for k in self._entries if isinstance(k, tuple) and k[:n] == prefix]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def nbytes(self):
+        # Recomputed on demand: lazily loaded entries grow after insertion.
+        with self._lock:
+            return sum(nbytes_of(v) for v in self._entries.values())
+
+    def evict(self):
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            sizes = OrderedDict((k, nbytes_of(v)) for k, v in self._entries.items())
+            total = sum(sizes.values())
+            # Never evict the most recently used entry, even if it alone exceeds the budget.
+            while total > self.max_bytes and len(self._entries) > 1:
+                key, _ = self._entries.popitem(last=False)
+                total -= sizes.pop(key)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
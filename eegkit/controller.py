@@ -1,11 +1,13 @@
 import pandas as pd
 from .subject import EEGSubjectData
 from .visualization import EEGVisualization
+from .profiling import span, get_recorder
 
 class EEGController:
-    def __init__(self, subject_data: 'EEGSubjectData', visualizer: 'EEGVisualization'):
+    def __init__(self, subject_data: 'EEGSubjectData', visualizer: 'EEGVisualization', renderer=None):
         self.subject_data = subject_data
         self.visualizer = visualizer
+        self.renderer = renderer  # optional rendering.FigureRenderer: plots as cached PNG/SVG bytes
 
     def list_subjects(self):
         return self.subject_data.list_subjects()
@@ -18,6 +20,21 @@ class EEGController:
         epochs, _ = task_data.get_epochs(l_freq=l_freq, h_freq=h_freq)
         return list(epochs.event_id.keys()) if epochs else []
 
+    def prefetch(self, subject, task, run=None, l_freq=1, h_freq=50, cancelled=None):
+        """
+        Load the recording and its filtered copy into the cache (safe to run in a worker thread).
+        `cancelled()` is checked before each stage; once it returns True the remaining stages are
+        skipped and None is returned.
+        """
+        with span("prefetch", subject=subject, task=task, run=run):
+            if cancelled is not None and cancelled():
+                return None
+            task_data = self.subject_data.get_task(subject, task, run)
+            if cancelled is not None and cancelled():
+                return None
+            task_data.get_filtered_raw(l_freq=l_freq, h_freq=h_freq)
+            return task_data
+
     def get_plot_specs(self):
         return self.visualizer.plot_specs
     
@@ -27,10 +44,34 @@ class EEGController:
     def show(self, subject, task, run=None, plot_type='time', **kwargs):
         spec = self.visualizer.plot_specs.get(plot_type)
         if spec:
-            return spec["function"](subject, task, run, **kwargs)
+            with span("show", plot=plot_type, subject=subject, task=task, run=run):
+                return spec["function"](subject, task, run, **kwargs)
         else:
             print(f"Plot type '{plot_type}' is not defined.")
 
+    def show_grand_average(self, keys, mode="evoked", **kwargs):
+        """Grand-average evoked/PSD per condition over (subject, task, run) keys; returns the accumulator."""
+        keys = list(keys)
+        with span("show", plot=f"grand average {mode}", recordings=len(keys)):
+            return self.visualizer.plot_grand_average(keys, mode=mode, **kwargs)
+
+    def render(self, subject, task, run=None, plot_type='time', **kwargs):
+        """Image bytes of one plot, from the renderer's cache when this exact plot was rendered before."""
+        if self.renderer is None:
+            raise ValueError("EEGController was created without a renderer")
+        if plot_type not in self.visualizer.plot_specs:
+            print(f"Plot type '{plot_type}' is not defined.")
+            return ()
+        with span("render", plot=plot_type, subject=subject, task=task, run=run):
+            return self.renderer.render(subject, task, run, plot_type, **kwargs)
+
+    def profile_stats(self, last_action=False, thread=None):
+        """Per-stage timing/bytes/cache table from profiling (None unless profiling.enable() was called)."""
+        recorder = get_recorder()
+        if recorder is None:
+            return None
+        return recorder.last_action(thread) if last_action else recorder.stats()
+
     def show_annotations(self, subject, task, run=None):
         """Return metadata dict or None."""
         task_data = self.subject_data.get_task(subject, task, run)
@@ -38,13 +79,13 @@ class EEGController:
 
     def show_table(self, subject, task, run=None, name='events', rows=10, l_freq=1, h_freq=50):
         """Return DataFrame or None."""
-        task_data = self.subject_data.get_task(subject, task, run)
-        return task_data.show_table(name=name, rows=rows, l_freq=l_freq, h_freq=h_freq)
+        with span("show_table", table=name, subject=subject, task=task, run=run):
+            task_data = self.subject_data.get_task(subject, task, run)
+            return task_data.show_table(name=name, rows=rows, l_freq=l_freq, h_freq=h_freq)
 
     def get_annotation_df(self, subject, task, run=None):
         task_data = self.subject_data.get_task(subject, task, run)
-        raw = task_data.get_filtered_raw()
-        annots = raw.annotations
+        annots = task_data.annotations
         df = pd.DataFrame({
             "onset": annots.onset,
             "duration": annots.duration,
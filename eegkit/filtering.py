@@ -0,0 +1,131 @@
+import mne
+from mne.annotations import _annotations_starts_stops
+import numpy as np
+from .store import raw_from_array
+
+FILTER_DESIGN = {"fir_design": "firwin", "skip_by_annotation": "edge"}
+FILTER_MODES = ("direct", "incremental", "chunked")
+DEFAULT_BLOCK_SIZE = 2 ** 16  # samples per block in chunked mode (~2 min at 500 Hz)
+
+# Max |incremental - direct| relative to max |direct|; the two differ only by FFT rounding.
+BANDPASS_TOLERANCE = 1e-9
+
+# Signal dtypes for EEGTaskData(precision=...). float32 keeps raw, filtered and epoch arrays at half
+# the size. Max |float32 - float64| of a filtered signal relative to max |float64|, for the check in
+# max_precision_deviation; the float32 filter rounds only its output, so expect ~1e-7.
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+FLOAT32_TOLERANCE = 1e-5
+
+
+def filtered_info(info, l_freq, h_freq):
+    """Copy of info with highpass/lowpass updated the way raw.filter() records a band."""
+    info = info.copy()
+    with info._unlock():
+        info["highpass"] = float(l_freq) if l_freq is not None else info["highpass"]
+        info["lowpass"] = float(h_freq) if h_freq is not None else info["lowpass"]
+    return info
+
+
+def filter_raw(raw, l_freq, h_freq, block_size=DEFAULT_BLOCK_SIZE, dtype=np.float64):
+    """
+    The reference path: one firwin FIR pass over a copy of the (preloaded) raw.
+    MNE only filters float64, so other dtypes go through stream_filter into an array of that dtype:
+    `raw` (preloaded or not, e.g. the source file) is read in float64 blocks and only the filtered
+    output is rounded.
+    """
+    if dtype != np.float64:
+        out = np.empty((len(raw.ch_names), raw.n_times), dtype=dtype)
+        stream_filter(raw, l_freq, h_freq, out, block_size=block_size)
+        return raw_from_array(out, filtered_info(raw.info, l_freq, h_freq), raw)
+    filtered = raw.copy()
+    filtered.filter(l_freq=l_freq, h_freq=h_freq, **FILTER_DESIGN)
+    return filtered
+
+
+def is_bandpass(l_freq, h_freq):
+    return l_freq is not None and h_freq is not None and l_freq < h_freq
+
+
+def combine_bandpass(raw, highpassed, lowpassed, h_freq):
+    """
+    MNE's firwin band-pass kernel is built as lowpass(h) - lowpass(l), and its high-pass kernel as
+    delta - lowpass(l), with each transition designed independently of the other edge. Filtering is
+    linear, so bandpass(l, h) = highpass(l) + lowpass(h) - raw. Caching the two single-edge stages
+    makes a change of one cutoff cost only that edge's filter; the long kernel of a low l_freq is
+    reused while h_freq is swept.
+    """
+    combined = highpassed.copy()
+    combined._data += lowpassed._data
+    combined._data -= raw._data
+    with combined.info._unlock():
+        combined.info["lowpass"] = float(h_freq)
+    return combined
+
+
+def max_relative_deviation(raw, l_freq, h_freq):
+    """Accuracy check of the incremental path against the direct firwin result (compare to BANDPASS_TOLERANCE)."""
+    direct = filter_raw(raw, l_freq, h_freq)
+    incremental = combine_bandpass(raw, filter_raw(raw, l_freq, None), filter_raw(raw, None, h_freq), h_freq)
+    scale = np.abs(direct._data).max() or 1.0
+    return float(np.abs(incremental._data - direct._data).max() / scale)
+
+
+def max_precision_deviation(raw, l_freq, h_freq):
+    """
+    Accuracy check of precision="float32" against the float64 path (compare to FLOAT32_TOLERANCE):
+    max |float32 - float64| of the filtered signal relative to max |float64|. The float32 path filters
+    float64 input and rounds each output sample once (relative error <= 2**-24), so offsets the
+    filter removes, such as the DC of DC-coupled recordings, do not enter the error. Rounding the
+    input instead would scale the error with that offset rather than with the filtered signal.
+    """
+    reference = filter_raw(raw, l_freq, h_freq)
+    compact = filter_raw(raw, l_freq, h_freq, dtype=np.float32)
+    scale = np.abs(reference._data).max() or 1.0
+    return float(np.abs(compact._data - reference._data).max() / scale)
+
+
+def _reflect_limited_pad(x, n_pad, side):
+    """mne.filter's 'reflect_limited' padding of one edge of x (channels, times): odd reflection, then zeros."""
+    n = x.shape[-1]
+    zeros = np.zeros(x.shape[:-1] + (max(n_pad - n + 1, 0),), dtype=x.dtype)
+    if side == "left":
+        return np.concatenate([zeros, 2 * x[:, :1] - x[:, n_pad:0:-1]], axis=-1)
+    return np.concatenate([2 * x[:, -1:] - x[:, -2:-n_pad - 2:-1], zeros], axis=-1)
+
+
+def stream_filter(raw, l_freq, h_freq, out, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Chunked overlap-save version of raw.filter(l_freq, h_freq, **FILTER_DESIGN) writing into `out`
+    (e.g. a SignalStore.create() memmap) without loading the recording: each block of output reads
+    block_size + len(h) - 1 samples via raw.get_data(start, stop), so peak memory is set by
+    block_size. Segments between 'edge' annotations are filtered independently with the same
+    reflect_limited edge padding as MNE, so the result matches the in-memory path up to FFT rounding.
+    """
+    from scipy.signal import oaconvolve  # deferred: scipy.signal takes ~1 s to import
+    sfreq = raw.info["sfreq"]
+    h = mne.filter.create_filter(None, sfreq, l_freq, h_freq, fir_design=FILTER_DESIGN["fir_design"], verbose=False)
+    half = (len(h) - 1) // 2
+    picks = mne.pick_types(raw.info, meg=True, eeg=True, seeg=True, ecog=True, dbs=True, exclude=[])
+    others = np.setdiff1d(np.arange(len(raw.ch_names)), picks)
+
+    onsets, ends = _annotations_starts_stops(raw, FILTER_DESIGN["skip_by_annotation"], invert=True)
+    for seg_start, seg_stop in zip(onsets, ends):
+        # The few samples the edge padding needs, read once per segment.
+        left = _reflect_limited_pad(raw.get_data(picks, seg_start, min(seg_start + half + 1, seg_stop)), half, "left")
+        right = _reflect_limited_pad(raw.get_data(picks, max(seg_stop - half - 1, seg_start), seg_stop), half, "right")
+
+        for start in range(seg_start, seg_stop, block_size):
+            stop = min(start + block_size, seg_stop)
+            lo, hi = max(start - half, seg_start), min(stop + half, seg_stop)
+            parts = [raw.get_data(picks, lo, hi)]
+            if start - half < seg_start:
+                parts.insert(0, left[:, left.shape[1] - (seg_start - (start - half)):])
+            if stop + half > seg_stop:
+                parts.append(right[:, :stop + half - seg_stop])
+            block = np.concatenate(parts, axis=-1) if len(parts) > 1 else parts[0]
+            # Preloaded float32 data is upcast one block at a time; `out` sets the stored precision.
+            block = block.astype(np.float64, copy=False)
+            out[picks, start:stop] = oaconvolve(block, h[np.newaxis], mode="valid", axes=-1)
+            if len(others):
+                out[others, start:stop] = raw.get_data(others, start, stop)
+    return out
@@ -0,0 +1,159 @@
+import mne
+from mne.time_frequency import SpectrumArray
+import numpy as np
+from .spectral import welch_psd
+from .profiling import span
+
+GRAND_AVERAGE_KINDS = ("evoked", "psd")
+
+
+class RunningStats:
+    """
+    Running mean and variance of equally shaped arrays, Welford-style: only count, mean and the sum
+    of squared deviations (M2) are kept. update() folds in a whole batch at once by merging its
+    mean/M2 (Chan et al.), which is exact and numerically stable like the one-sample update.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self._m2 = None
+
+    def add(self, value):
+        self.update(np.asarray(value)[np.newaxis])
+
+    def update(self, batch):
+        batch = np.asarray(batch, dtype=np.float64)
+        n = len(batch)
+        if n == 0:
+            return
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+        if self.count == 0:
+            self.count, self.mean, self._m2 = n, batch_mean, batch_m2
+            return
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * (n / total)
+        self._m2 += batch_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1); NaN until two values have been added."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def sem(self):
+        return np.sqrt(self.variance / self.count)
+
+    @property
+    def nbytes(self):
+        return 0 if self.mean is None else self.mean.nbytes + self._m2.nbytes
+
+
+class GrandAverage:
+    """
+    Cross-recording evoked responses ("evoked") or epoch PSDs ("psd") per condition, accumulated one
+    recording at a time. For every condition two RunningStats are kept: `recordings` over each
+    recording's condition mean (the usual grand average, every recording weighted equally) and
+    `epochs` pooled over all epochs. A recording the cache did not already hold is released after it
+    is folded in, so memory depends on channels x times (or freqs) x conditions, not on cohort size.
+    Recordings whose channels or time/frequency axis differ from the first one are skipped.
+    """
+
+    def __init__(self, subject_data, kind="evoked", l_freq=1, h_freq=50, tmin=None, tmax=None, fmin=1.0,
+                 fmax=50.0, **epoch_params):
+        if kind not in GRAND_AVERAGE_KINDS:
+            raise ValueError(f"kind must be one of {GRAND_AVERAGE_KINDS}, got {kind!r}")
+        self.subject_data = subject_data
+        self.kind = kind
+        self.l_freq, self.h_freq = l_freq, h_freq
+        self.tmin, self.tmax = tmin, tmax
+        self.fmin, self.fmax = fmin, fmax
+        # Strided epochs are views over the filtered raw, so no preloaded copy is made per recording.
+        self.epoch_params = {"backend": "strided", **epoch_params}
+
+        self.info = None
+        self.axis = None  # epoch times (evoked) or frequencies (psd) of the accumulated arrays
+        self.stats = {}  # condition → {"recordings": RunningStats, "epochs": RunningStats}
+        self.added = []
+        self.skipped = []  # (key, reason)
+
+    def _values(self, epochs):
+        """(n_epochs, n_channels, n_axis) array for this kind, and its axis."""
+        times = epochs.times
+        mask = np.ones(len(times), bool)
+        if self.tmin is not None:
+            mask &= times >= self.tmin
+        if self.tmax is not None:
+            mask &= times <= self.tmax
+        data = epochs.get_data()[..., mask]
+        if self.kind == "evoked":
+            return data, times[mask]
+        return welch_psd(data, epochs.info["sfreq"], self.fmin, self.fmax)
+
+    def add(self, subject, task, run=None):
+        """Fold one recording in; returns False if it has no epochs or does not match the first recording."""
+        key = (subject, task, run)
+        resident = key in self.subject_data.cache
+        with span("grand_average_add", kind=self.kind, subject=subject, task=task, run=run):
+            try:
+                reason = self._add(subject, task, run)
+            finally:
+                if not resident:
+                    self.subject_data.release(subject, task, run)
+        if reason is not None:
+            self.skipped.append((key, reason))
+            return False
+        self.added.append(key)
+        return True
+
+    def _add(self, subject, task, run):
+        epochs, _ = self.subject_data.get_task(subject, task, run).get_epochs(
+            self.l_freq, self.h_freq, **self.epoch_params)
+        if epochs is None or len(epochs) == 0:
+            return "no epochs"
+        values, axis = self._values(epochs)
+        if self.info is None:
+            self.info, self.axis = epochs.info, axis
+        elif epochs.ch_names != self.info["ch_names"]:
+            return "channels differ from the first recording"
+        elif len(axis) != len(self.axis) or not np.allclose(axis, self.axis):
+            return "time/frequency axis differs from the first recording"
+
+        codes = epochs.events[:, 2]
+        for condition, code in epochs.event_id.items():
+            selected = values[codes == code]
+            if len(selected) == 0:
+                continue
+            stats = self.stats.setdefault(condition, {"recordings": RunningStats(), "epochs": RunningStats()})
+            stats["recordings"].add(selected.mean(axis=0))
+            stats["epochs"].update(selected)
+        return None
+
+    def run(self, keys, log=print):
+        for i, (subject, task, run) in enumerate(keys, 1):
+            if not self.add(subject, task, run):
+                log(f"[{i}] skipped {subject} {task}" + (f" run {run}" if run else "") + f": {self.skipped[-1][1]}")
+        log(f"{len(self.added)} recordings averaged, {len(self.skipped)} skipped")
+        return self
+
+    @property
+    def conditions(self):
+        return sorted(self.stats)
+
+    @property
+    def nbytes(self):
+        return sum(s.nbytes for stats in self.stats.values() for s in stats.values())
+
+    def evoked(self, condition, level="recordings"):
+        """mne.EvokedArray of the grand-average response; nave is the number of recordings (or epochs)."""
+        stats = self.stats[condition][level]
+        return mne.EvokedArray(stats.mean, self.info, tmin=self.axis[0], nave=stats.count, comment=condition,
+                               verbose=False)
+
+    def spectrum(self, condition, level="recordings"):
+        return SpectrumArray(self.stats[condition][level].mean, self.info, self.axis, verbose=False)
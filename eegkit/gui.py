@@ -1,7 +1,11 @@
 import ipywidgets as widgets
-from IPython.display import display, clear_output
+from IPython.display import display, clear_output, Image, SVG
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import current_thread, Event
 import json
 from .controller import EEGController
+from . import profiling
 
 def parse_time_input(text_value):
     text_value = text_value.strip()
@@ -12,8 +16,19 @@ def extract_params(spec, kwargs):
     return {k: kwargs[k] for k in kwargs if k in valid_keys}
 
 class EEGUI:
-    def __init__(self, controller: 'EEGController'):
+    def __init__(self, controller: 'EEGController', prefetch=True, profile=False):
         self.controller = controller
+        # profile=True: record stage spans (see profiling.py) and show the last action's breakdown.
+        self._profile = profile
+        if profile:
+            profiling.enable()
+        # Background loading: the selected recording plus the next one in dropdown order.
+        self._prefetch_enabled = prefetch
+        self._loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="eegui-prefetch")
+        self._loads = {}  # (subject, task, run, l_freq, h_freq) → Future
+        self._stops = {}  # same key → Event that makes a running load skip its remaining stages
+        # Widgets are only touched from the kernel thread: workers queue status lines here instead.
+        self._load_messages = deque()
         self._init_widgets()
         self._build_ui()
         self._connect_events()
@@ -52,6 +67,7 @@ class EEGUI:
         )
         self.info_button = widgets.Button(description='Show Info', button_style='info')
         self.output = widgets.Output()
+        self.profile_output = widgets.Output()
 
         self.table_param_box = widgets.VBox([])
 
@@ -70,11 +86,12 @@ class EEGUI:
             self.plot_button,
             self.table_controls,
             self.output
-        ])
+        ] + ([widgets.HTML("<b>Last action</b>"), self.profile_output] if self._profile else []))
 
     def _connect_events(self):
         self.mode_toggle.observe(self.update_mode_ui, names='value')
         self.subject_dropdown.observe(self.update_tasks, names='value')
+        self.task_dropdown.observe(self.on_selection_change, names='value')
         self.plot_type.observe(self.update_param_inputs, names='value')
         self.plot_button.on_click(self.do_plot)
         self.info_button.on_click(self.do_show_info)
@@ -107,6 +124,86 @@ class EEGUI:
         if formatted:
             self.task_dropdown.value = formatted[0][1]
 
+    def _filter_band(self):
+        l_freq = self.param_inputs.get("l_freq")
+        h_freq = self.param_inputs.get("h_freq")
+        return (
+            float(l_freq.value) if l_freq else self.default_params["l_freq"]["default"],
+            float(h_freq.value) if h_freq else self.default_params["h_freq"]["default"],
+        )
+
+    def _load_key(self, subject, task, run):
+        return (subject, task, run, *self._filter_band())
+
+    def _submit_load(self, key, speculative=False):
+        future = self._loads.get(key)
+        if future is not None and not future.cancelled() and not (future.done() and future.exception()):
+            return future
+        stop = Event()
+        future = self._loader.submit(self.controller.prefetch, *key, cancelled=stop.is_set)
+        if not speculative:
+            subject, task, run = key[:3]
+            name = f"{subject} - {task}" + (f" (Run {run})" if run else "")
+            self.output.append_stdout(f"Loading {name} in background...\n")
+            future.add_done_callback(lambda f: self._load_messages.append(self._load_status(f, stop, name)))
+        self._loads[key] = future
+        self._stops[key] = stop
+        return future
+
+    @staticmethod
+    def _load_status(future, stop, name):
+        if future.cancelled() or stop.is_set():
+            return f"Background load of {name} cancelled.\n"
+        if future.exception() is not None:
+            return f"Background load of {name} failed: {future.exception()}\n"
+        return f"Loaded {name}.\n"
+
+    def _flush_load_messages(self):
+        """Show status lines queued by finished loads (runs in the kernel thread)."""
+        while self._load_messages:
+            self.output.append_stdout(self._load_messages.popleft())
+
+    def on_selection_change(self, *args):
+        self._flush_load_messages()
+        if not self._prefetch_enabled or self.task_dropdown.value is None:
+            return
+        subject = self.subject_dropdown.value
+        task, run = self.task_dropdown.value
+        current = self._load_key(subject, task, run)
+
+        next_key = None
+        values = [value for _, value in self.task_dropdown.options]
+        position = values.index((task, run))
+        if position + 1 < len(values):
+            next_key = self._load_key(subject, *values[position + 1])
+
+        # Drop stale loads: queued ones are cancelled, running ones stop after their current stage
+        # (opening the recording, or loading + filtering it), which still runs to completion and
+        # delays the new selection by at most that much.
+        for key, future in list(self._loads.items()):
+            if key not in (current, next_key):
+                future.cancel()
+                self._stops[key].set()
+                if future.done():
+                    del self._loads[key], self._stops[key]
+
+        self._submit_load(current)
+        if next_key is not None:
+            self._submit_load(next_key, speculative=True)
+
+    def _wait_for_load(self, subject, task, run):
+        # Any band: a load still running for an earlier band holds the recording's lock anyway.
+        pending = [future for key, future in list(self._loads.items())
+                   if key[:3] == (subject, task, run) and not future.done()]
+        if pending:
+            print("Waiting for background load...")
+        for future in pending:
+            try:
+                future.result()
+            except Exception:
+                pass  # the foreground call below retries the load and reports the error
+        self._flush_load_messages()
+
     def _create_widget(self, param_type, default):
         if param_type == "float":
             return widgets.FloatText(value=default, layout=widgets.Layout(width='150px'))
@@ -154,20 +251,30 @@ class EEGUI:
             clear_output(wait=True)
             subject = self.subject_dropdown.value
             task, run = self.task_dropdown.value
+            self._wait_for_load(subject, task, run)
             kwargs = {
                 k: (eval(w.value) if self.plot_specs[self.plot_type.value]["params"].get(k, {}).get("type") == "list_float" else w.value)
                 for k, w in self.param_inputs.items()
             }
             spec = self.plot_specs[self.plot_type.value]
             filtered = extract_params({"params": {**self.default_params, **spec["params"]}}, kwargs)
-            spec["function"](subject, task, run, **filtered)
+            if self.controller.renderer is not None:
+                # Static images: instant when this plot was rendered before (here or by a batch run).
+                for image in self.controller.render(subject, task, run, self.plot_type.value, **filtered):
+                    display(SVG(data=image) if self.controller.renderer.fmt == "svg" else Image(data=image))
+            else:
+                self.controller.show(subject, task, run, self.plot_type.value, **filtered)
             self.update_param_inputs()
+        self._flush_load_messages()
+        self._show_profile()
 
     def do_show_info(self, _):
         with self.output:
             clear_output(wait=True)
             subject = self.subject_dropdown.value
             task, run = self.task_dropdown.value
+            if self.table_type.value == 'epochs':
+                self._wait_for_load(subject, task, run)  # events/channels/metadata need no signal
             l_freq = float(self.param_inputs["l_freq"].value)
             h_freq = float(self.param_inputs["h_freq"].value)
 
@@ -183,6 +290,22 @@ class EEGUI:
                 display(df)
             else:
                 print("No table data available.")
+        self._flush_load_messages()
+        self._show_profile()
+
+    def _show_profile(self):
+        if not self._profile:
+            return
+        df = self.controller.profile_stats(last_action=True, thread=current_thread().name)
+        with self.profile_output:
+            clear_output(wait=True)
+            if df is None or df.empty:
+                print("No spans recorded.")
+                return
+            table = df[["name", "seconds", "cache", "held_bytes"]].copy()
+            table["name"] = ["  " * d + n for d, n in zip(df["depth"], df["name"])]
+            table["held_MB"] = table.pop("held_bytes") / 2 ** 20
+            display(table.reset_index(drop=True))
 
     def show(self):
         display(self.ui)
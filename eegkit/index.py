@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import os
+import re
+import sqlite3
+
+EEG_FILE_PATTERN = re.compile(
+    r"(sub-(?P<subject>[^_]+))_task-(?P<task>[^_]+)(?:_run-(?P<run>\d+))?_eeg\.set"
+)
+SIDECARS = ("eeg.json", "events.tsv", "channels.tsv", "electrodes.tsv")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subjects (
+    subject TEXT PRIMARY KEY,
+    eeg_mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS recordings (
+    subject TEXT NOT NULL,
+    task TEXT NOT NULL,
+    run TEXT,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    fdt_size INTEGER,
+    has_json INTEGER,
+    has_events INTEGER,
+    has_channels INTEGER,
+    has_electrodes INTEGER,
+    UNIQUE (subject, task, run)
+);
+CREATE INDEX IF NOT EXISTS recordings_task ON recordings (task, run);
+"""
+
+_COLUMNS = ("subject", "task", "run", "path", "size", "mtime_ns", "fdt_size",
+            "has_json", "has_events", "has_channels", "has_electrodes")
+
+
+def default_index_path(data_dir):
+    digest = hashlib.sha1(str(Path(data_dir).resolve()).encode()).hexdigest()[:16]
+    return Path.home() / ".cache" / "eegkit" / f"index-{digest}.sqlite"
+
+
+def _stat_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _scan_eeg_dir(subject, eeg_dir):
+    """One os.scandir per subject: recordings with sizes/mtimes and which sidecars exist."""
+    try:
+        entries = {e.name: e for e in os.scandir(eeg_dir)}
+    except FileNotFoundError:
+        return []
+
+    rows = []
+    for name, entry in entries.items():
+        if not name.endswith("_eeg.set"):
+            continue
+        match = EEG_FILE_PATTERN.match(name)
+        if not match:
+            continue
+        prefix = name[: -len("eeg.set")]
+        st = entry.stat()
+        fdt = entries.get(prefix + "eeg.fdt")
+        rows.append((
+            subject, match.group("task"), match.group("run"), entry.path, st.st_size, st.st_mtime_ns,
+            fdt.stat().st_size if fdt is not None else None,
+            *(int(prefix + sidecar in entries) for sidecar in SIDECARS),
+        ))
+    return rows
+
+
+class DatasetIndex:
+    """
+    Persisted SQLite index of a BIDS release: subjects, recordings, file sizes/mtimes and sidecars.
+    refresh() rescans only subjects whose eeg/ directory mtime changed (files added, removed or
+    renamed); pass full=True to rescan everything, e.g. after files were rewritten in place.
+    """
+
+    def __init__(self, data_dir, path=None):
+        self.data_dir = Path(data_dir)
+        self.path = Path(path) if path is not None else default_index_path(data_dir)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def refresh(self, full=False, workers=32, subjects=None):
+        """
+        Rescan new/changed subjects. `subjects` forces a rescan of those subjects regardless of
+        mtimes, e.g. sync.changed_subjects(manifest) after an S3Sync run.
+        """
+        forced = set(subjects or ())
+        with os.scandir(self.data_dir) as it:
+            subjects = sorted(e.name for e in it if e.name.startswith("sub-") and e.is_dir())
+        known = dict(self._conn.execute("SELECT subject, eeg_mtime_ns FROM subjects"))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            eeg_dirs = [self.data_dir / s / "eeg" for s in subjects]
+            mtimes = dict(zip(subjects, pool.map(_stat_mtime, eeg_dirs)))
+            changed = [s for s in subjects if full or s in forced or s not in known or known[s] != mtimes[s]]
+            scanned = pool.map(_scan_eeg_dir, changed, [self.data_dir / s / "eeg" for s in changed])
+            rows = [row for subject_rows in scanned for row in subject_rows]
+
+        removed = [s for s in known if s not in mtimes]
+        with self._conn:
+            for subject in changed + removed:
+                self._conn.execute("DELETE FROM recordings WHERE subject = ?", (subject,))
+            self._conn.executemany("DELETE FROM subjects WHERE subject = ?", [(s,) for s in removed])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subjects VALUES (?, ?)", [(s, mtimes[s]) for s in changed]
+            )
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO recordings VALUES ({', '.join('?' * len(_COLUMNS))})", rows
+            )
+        return {"subjects": len(subjects), "rescanned": len(changed), "removed": len(removed)}
+
+    def subjects(self):
+        return [s for (s,) in self._conn.execute("SELECT subject FROM subjects ORDER BY subject")]
+
+    def task_map(self):
+        task_map = {}
+        for subject, task, run in self._conn.execute("SELECT subject, task, run FROM recordings"):
+            task_map.setdefault(subject, []).append((task, run))
+        return task_map
+
+    def recordings(self, where=None, params=()):
+        query = f"SELECT {', '.join(_COLUMNS)} FROM recordings"
+        if where:
+            query += f" WHERE {where}"
+        query += " ORDER BY subject, task, run"
+        return [dict(zip(_COLUMNS, row)) for row in self._conn.execute(query, params)]
@@ -0,0 +1,83 @@
+import mne
+import numpy as np
+from .cache import nbytes_of, freeze
+
+PYRAMID_FACTORS = (8, 32, 128, 512)
+SCREEN_WIDTH = 2000  # horizontal pixels a time plot is assumed to span
+
+
+def _minmax(data, factor):
+    """Per-bin (min, max) of `factor` consecutive samples, interleaved as (n_channels, 2 * n_bins)."""
+    n_channels, n_times = data.shape
+    n_bins = -(-n_times // factor)
+    pad = n_bins * factor - n_times
+    if pad:
+        data = np.concatenate([data, np.repeat(data[:, -1:], pad, axis=1)], axis=1)
+    bins = data.reshape(n_channels, n_bins, factor)
+    envelope = np.empty((n_channels, n_bins, 2), dtype=data.dtype)
+    bins.min(axis=-1, out=envelope[..., 0])
+    bins.max(axis=-1, out=envelope[..., 1])
+    return envelope.reshape(n_channels, 2 * n_bins)
+
+
+def overview_factor(sfreq, duration, factors=PYRAMID_FACTORS, width=SCREEN_WIDTH):
+    """Coarsest factor that still leaves ~one min/max pair per pixel, or None for full resolution."""
+    n_samples = duration * sfreq
+    usable = [f for f in factors if n_samples / f >= width]
+    return max(usable) if usable else None
+
+
+def build_levels(data, factors=PYRAMID_FACTORS):
+    """
+    Min/max decimation pyramid. The first level reads the full-rate data once; each coarser level
+    is reduced from the previous one (the min of mins and max of maxes of its bins).
+    """
+    levels = {}
+    previous, previous_factor = data, 1
+    for factor in sorted(factors):
+        ratio = factor // previous_factor
+        if previous is data:
+            level = _minmax(data, factor)
+        else:
+            envelope = previous.reshape(previous.shape[0], -1, 2)
+            mins = _minmax(envelope[..., 0], ratio)[:, 0::2]
+            maxs = _minmax(envelope[..., 1], ratio)[:, 1::2]
+            level = np.stack([mins, maxs], axis=-1).reshape(previous.shape[0], -1)
+        levels[factor] = level
+        previous, previous_factor = level, factor
+    return levels
+
+
+class OverviewPyramid:
+    """
+    Min/max envelopes of a filtered recording at several decimation factors. Drawing the
+    interleaved min/max samples as a line reproduces the full-rate trace's envelope, so a
+    10-minute window renders as a few thousand points per channel.
+    """
+
+    def __init__(self, levels, info, first_samp, annotations):
+        self.levels = {factor: freeze(level) for factor, level in levels.items()}
+        self.info = info
+        self.first_samp = first_samp
+        self.annotations = annotations
+
+    @classmethod
+    def from_raw(cls, raw, factors=PYRAMID_FACTORS):
+        return cls(build_levels(raw._data, factors), raw.info, raw.first_samp, raw.annotations)
+
+    @property
+    def nbytes(self):
+        return sum(nbytes_of(level) for level in self.levels.values())
+
+    def factor_for(self, duration, width=SCREEN_WIDTH):
+        return overview_factor(self.info["sfreq"], duration, tuple(self.levels), width)
+
+    def as_raw(self, factor):
+        """The level as a Raw at 2 * sfreq / factor, with the source's annotations and channel info."""
+        info = self.info.copy()
+        with info._unlock():
+            info["sfreq"] = 2 * self.info["sfreq"] / factor
+            info["lowpass"] = info["sfreq"] / 2
+        raw = mne.io.RawArray(self.levels[factor], info, first_samp=2 * self.first_samp // factor, verbose=False)
+        raw.set_annotations(self.annotations)
+        return raw
@@ -0,0 +1,240 @@
+from mne import events_from_annotations, Epochs
+import numpy as np
+import pandas as pd
+from .events import compile_events
+from .profiling import span
+from .windows import WindowedEpochs
+
+EPOCH_BACKENDS = ("mne", "strided")
+
+PREPROCESSORS = {}  # task name → TaskPreprocessor subclass
+
+
+def register_preprocessor(*tasks):
+    def decorator(cls):
+        for task in tasks:
+            PREPROCESSORS[task] = cls
+        return cls
+    return decorator
+
+
+def get_preprocessor(task, **params):
+    cls = PREPROCESSORS.get(task)
+    return cls(**params) if cls is not None else None
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _events_within(events, start, stop, tmin, tmax, sfreq):
+    """Events whose [tmin, tmax] window lies inside absolute samples [start, stop]."""
+    smin, smax = int(round(tmin * sfreq)), int(round(tmax * sfreq))
+    keep = (events[:, 0] + smin >= start) & (events[:, 0] + smax <= stop)
+    return events[keep]
+
+
+def list_preprocessors():
+    return {task: cls.defaults for task, cls in PREPROCESSORS.items()}
+
+
+class TaskPreprocessor:
+    """
+    Declares how one task is epoched: which events, which window, how epochs are labeled.
+    Every parameter lives in self.params (defaults overridable per call), so cache_key()
+    identifies exactly one epoching variant.
+    """
+    defaults = {"tmin": 0.0, "tmax": 2.0, "baseline": None, "detrend": None}
+
+    def __init__(self, backend="mne", **params):
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} got unexpected parameters {sorted(unknown)}")
+        if backend not in EPOCH_BACKENDS:
+            raise ValueError(f"backend must be one of {EPOCH_BACKENDS}, got {backend!r}")
+        # "strided": WindowedEpochs views over the filtered raw instead of preloaded mne.Epochs
+        self.params = {**self.defaults, **params, "backend": backend}
+
+    def cache_key(self):
+        # Fingerprint of every parameter (nested values made hashable), prefixed by the class.
+        return (type(self).__name__,) + _hashable(self.params)
+
+    def window(self, sfreq):
+        """(tmin, tmax) of each epoch in seconds for a recording sampled at `sfreq`."""
+        return self.params["tmin"], self.params["tmax"]
+
+    def select_events(self, task_data):
+        """Return CompiledEvents (events array, event_id, per-event labels) or None."""
+        raise NotImplementedError
+
+    def __call__(self, task_data, l_freq, h_freq):
+        compiled = self.select_events(task_data)
+        if compiled is None or len(compiled) == 0:
+            return None, None
+
+        filtered_raw = task_data.get_filtered_raw(l_freq=l_freq, h_freq=h_freq)
+        tmin, tmax = self.window(filtered_raw.info["sfreq"])
+        epochs = self.make_epochs(
+            filtered_raw, compiled.events, compiled.event_id, tmin, tmax,
+            baseline=self.params["baseline"], detrend=self.params["detrend"]
+        )
+        labels = compiled.labels[epochs.selection]
+        return epochs, labels
+
+    def make_epochs(self, filtered_raw, events, event_id, tmin, tmax, baseline=None, detrend=None):
+        with span("make_epochs", backend=self.params["backend"], n_events=len(events)) as s:
+            epochs = self._make_epochs(filtered_raw, events, event_id, tmin, tmax, baseline, detrend)
+            s.held(epochs)
+            return epochs
+
+    def _make_epochs(self, filtered_raw, events, event_id, tmin, tmax, baseline, detrend):
+        if self.params["backend"] == "strided":
+            return WindowedEpochs(filtered_raw, events, event_id, tmin, tmax, baseline=baseline, detrend=detrend)
+        return Epochs(
+            filtered_raw,
+            events=events,
+            event_id=event_id,
+            tmin=tmin,
+            tmax=tmax,
+            baseline=baseline,
+            proj=True,
+            preload=True,
+            detrend=detrend
+        )
+
+
+class EventPreprocessor(TaskPreprocessor):
+    """Epochs around events.tsv rows whose 'value' fully matches `value_pattern`, labeled by value."""
+    defaults = {**TaskPreprocessor.defaults, "value_pattern": None}
+
+    def select_events(self, task_data):
+        if task_data.events is None:
+            return None
+        return task_data.compile_events(pattern=self.params["value_pattern"])
+
+
+@register_preprocessor("surroundSupp")
+class SurroundSuppPreprocessor(TaskPreprocessor):
+    """
+    Preprocess surroundSupp task using 'stim_ON' events.
+    Epochs are 2.4s long and labeled by background + foreground_contrast + stimulus_cond.
+    """
+    defaults = {"tmin": 0.0, "duration": 2.4, "baseline": None, "detrend": 1}
+    label_columns = ('background', 'foreground_contrast', 'stimulus_cond')
+
+    @staticmethod
+    def label(background, foreground_contrast, stimulus_cond):
+        return f"bg{int(background)}_fg{foreground_contrast}_stim{int(stimulus_cond)}"
+
+    def window(self, sfreq):
+        return self.params["tmin"], self.params["tmin"] + self.params["duration"]
+
+    def select_events(self, task_data):
+        return task_data.compile_events('stim_ON', self.label_columns, self.label)
+
+
+@register_preprocessor("RestingState")
+class RestingStatePreprocessor(TaskPreprocessor):
+    """
+    Crop raw based on 'resting_start' to 'break cnt' in events.tsv,
+    then epoch using eye condition annotations.
+    """
+    defaults = {"tmin": 0.0, "tmax": 20.0}
+
+    def __call__(self, task_data, l_freq, h_freq):
+        filtered_raw = task_data.get_filtered_raw(l_freq=l_freq, h_freq=h_freq)
+        sfreq = filtered_raw.info['sfreq']
+
+        # Step 1: Find resting_start and break cnt from TSV
+        df = task_data.events
+
+        t_start = df[df['value'] == 'resting_start']['onset'].values[0]
+        t_end = df[df['value'] == 'break cnt']['onset'].values[1]
+
+        # Step 2: Restrict to this resting window. Selecting the events whose epoch fits inside it
+        # keeps the same epochs as cropping, without cropping the shared cached filtered raw.
+        start = filtered_raw.first_samp + int(round(t_start * sfreq))
+        stop = filtered_raw.first_samp + int(round(t_end * sfreq))
+
+        # Step 3: Extract events from the annotations
+        events, event_id = events_from_annotations(task_data.get_header())
+        events = _events_within(events, start, stop, self.params["tmin"], self.params["tmax"], sfreq)
+
+        eye_event_id = {
+            'open': event_id['instructed_toOpenEyes'],
+            'close': event_id['instructed_toCloseEyes']
+        }
+
+        # Step 4: Create epochs based on eye condition labels
+        epochs = self.make_epochs(filtered_raw, events, eye_event_id, self.params["tmin"], self.params["tmax"])
+
+        labels = epochs.events[:, -1] - eye_event_id['open']  # 0=open, 1=close
+
+        return epochs, labels
+
+
+@register_preprocessor("contrastChangeDetection")
+class ContrastChangePreprocessor(EventPreprocessor):
+    """Target onsets, labeled left_target/right_target."""
+    defaults = {**EventPreprocessor.defaults, "value_pattern": r"(left|right)_target", "tmax": 2.0}
+
+
+@register_preprocessor("seqLearning6target", "seqLearning8target")
+class SeqLearningPreprocessor(EventPreprocessor):
+    """Dot flash onsets of the sequence, labeled by dot number."""
+    defaults = {**EventPreprocessor.defaults, "value_pattern": r"dot_no\d+_ON", "tmax": 1.0}
+
+
+class SegmentPreprocessor(TaskPreprocessor):
+    """
+    Fixed-length windows tiling the span from the first `start_value` row to the next `stop_value`
+    row of events.tsv (None → start/end of the recording), for tasks without trial structure.
+    """
+    defaults = {"start_value": None, "stop_value": None, "duration": 2.0, "overlap": 0.0,
+                "baseline": None, "detrend": None}
+
+    def window(self, sfreq):
+        return 0.0, self.params["duration"] - 1.0 / sfreq
+
+    def _bounds(self, task_data):
+        df = task_data.events
+        n_times = task_data.get_header().n_times
+        start, stop = 0, n_times
+        if self.params["start_value"] is not None:
+            rows = df[df['value'] == self.params["start_value"]]
+            if rows.empty:
+                return None
+            start = int(rows['sample'].values[0])
+        if self.params["stop_value"] is not None:
+            rows = df[(df['value'] == self.params["stop_value"]) & (df['sample'] > start)]
+            if not rows.empty:
+                stop = int(rows['sample'].values[0])
+        return start, min(stop, n_times)
+
+    def select_events(self, task_data):
+        sfreq = task_data.get_header().info["sfreq"]
+        bounds = self._bounds(task_data) if task_data.events is not None else (0, task_data.get_header().n_times)
+        if bounds is None:
+            return None
+        start, stop = bounds
+        n_window = int(round(self.params["duration"] * sfreq))
+        step = max(int(round((self.params["duration"] - self.params["overlap"]) * sfreq)), 1)
+        samples = np.arange(start, stop - n_window + 1, step)
+        rows = pd.DataFrame({"sample": samples, "label": task_data.task})
+        return compile_events(rows, ["label"], str)
+
+
+@register_preprocessor("symbolSearch")
+class SymbolSearchPreprocessor(SegmentPreprocessor):
+    defaults = {**SegmentPreprocessor.defaults}
+
+
+@register_preprocessor("DespicableMe", "DiaryOfAWimpyKid", "FunwithFractals", "ThePresent")
+class MoviePreprocessor(SegmentPreprocessor):
+    defaults = {**SegmentPreprocessor.defaults, "start_value": "video_start", "stop_value": "video_stop"}
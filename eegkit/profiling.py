@@ -0,0 +1,193 @@
+from itertools import count
+from threading import Lock, current_thread, local
+import json
+import time
+import tracemalloc
+from .cache import nbytes_of
+
+_recorder = None  # the active SpanRecorder; None → span() returns the shared no-op span
+_COLUMNS = ("action", "name", "parent", "depth", "thread", "start", "seconds", "held_bytes", "alloc_bytes", "cache")
+
+
+class _NullSpan:
+    """What span() returns while instrumentation is off: one shared object, every method a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def hit(self, source="memory"):
+        pass
+
+    def miss(self):
+        pass
+
+    def held(self, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, recorder, name, tags):
+        self._recorder = recorder
+        self.name = name
+        self.tags = tags
+        self.cache = None
+        self.held_bytes = None
+
+    def hit(self, source="memory"):
+        """Mark the span as served from a cache ("memory", "store", ...)."""
+        self.cache = f"hit:{source}"
+
+    def miss(self):
+        self.cache = "miss"
+
+    def held(self, value):
+        """Record the resident size of the span's result (see cache.nbytes_of)."""
+        self.held_bytes = nbytes_of(value)
+
+    def __enter__(self):
+        stack = self._recorder._stack()
+        self.parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        self.action = self.parent.action if self.parent is not None else next(self._recorder._actions)
+        stack.append(self)
+        self._alloc = tracemalloc.get_traced_memory()[0] if self._recorder.track_memory else None
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._start
+        alloc = tracemalloc.get_traced_memory()[0] - self._alloc if self._alloc is not None else None
+        self._recorder._stack().pop()
+        self._recorder._add({
+            "action": self.action,
+            "name": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "depth": self.depth,
+            "thread": self._recorder._thread_name(),
+            "start": self._start,
+            "seconds": seconds,
+            "held_bytes": self.held_bytes,
+            "alloc_bytes": alloc,
+            "cache": self.cache,
+            **self.tags,
+        })
+        return False
+
+
+class SpanRecorder:
+    """
+    Collects one record per finished span: name, parent, wall time, bytes held by the result,
+    net bytes allocated (with track_memory, via tracemalloc) and cache hit/miss. Spans opened while
+    no other span is open on that thread start a new "action" (a plot, a table, a prefetch).
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.records = []
+        self._lock = Lock()
+        self._local = local()
+        self._actions = count(1)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @staticmethod
+    def _thread_name():
+        return current_thread().name
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+    def to_frame(self, action=None):
+        import pandas as pd  # only when reading results, so span() never pulls in pandas
+        with self._lock:
+            records = list(self.records)
+        df = pd.DataFrame(records, columns=list(dict.fromkeys(_COLUMNS + tuple(k for r in records for k in r))))
+        return df[df["action"] == action] if action is not None else df
+
+    def last_action(self, thread=None):
+        """Spans of the most recently finished top-level action (optionally: on that thread), in start order."""
+        with self._lock:
+            actions = [r["action"] for r in self.records
+                       if r["depth"] == 0 and (thread is None or r["thread"] == thread)]
+        if not actions:
+            return self.to_frame().iloc[0:0]
+        return self.to_frame(actions[-1]).sort_values("start")
+
+    def stats(self):
+        return span_stats(self.to_frame())
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_frame().to_dict(orient="records"), f, indent=2, default=str)
+
+    def to_csv(self, path):
+        self.to_frame().to_csv(path, index=False)
+
+
+def span_stats(df):
+    """Per span name: count, total/mean/max seconds, cache hits/misses, max bytes held/allocated."""
+    import pandas as pd
+    if df.empty:
+        return pd.DataFrame(columns=["count", "total_s", "mean_s", "max_s", "hits", "misses",
+                                     "held_bytes", "alloc_bytes"])
+    grouped = df.groupby("name")
+    return pd.DataFrame({
+        "count": grouped.size(),
+        "total_s": grouped["seconds"].sum(),
+        "mean_s": grouped["seconds"].mean(),
+        "max_s": grouped["seconds"].max(),
+        "hits": grouped["cache"].apply(lambda c: c.astype(str).str.startswith("hit").sum()),
+        "misses": grouped["cache"].apply(lambda c: (c == "miss").sum()),
+        "held_bytes": grouped["held_bytes"].max(),
+        "alloc_bytes": grouped["alloc_bytes"].max(),
+    }).sort_values("total_s", ascending=False)
+
+
+def enable(track_memory=False):
+    """Start recording spans (idempotent); returns the recorder. track_memory adds tracemalloc's overhead."""
+    global _recorder
+    if _recorder is None:
+        _recorder = SpanRecorder(track_memory=track_memory)
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _recorder.track_memory = _recorder.track_memory or track_memory
+    return _recorder
+
+
+def disable():
+    """Stop recording; returns the recorder that was active (or None) so its records can still be read."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None and recorder.track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return recorder
+
+
+def get_recorder():
+    return _recorder
+
+
+def span(name, **tags):
+    """
+    Context manager timing one stage, e.g. `with span("filter", l_freq=1) as s: ...; s.miss()`.
+    Disabled (the default), this is one global lookup returning a shared no-op object.
+    """
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return Span(recorder, name, tags)
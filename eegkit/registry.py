@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import json
+import pandas as pd
+from .subject import EEGSubjectData
+
+
+def _sidecar_duration(set_path):
+    json_path = Path(str(set_path)[: -len("eeg.set")] + "eeg.json")
+    if not json_path.exists():
+        return None
+    with open(json_path) as f:
+        return json.load(f).get("RecordingDuration")
+
+
+class DatasetRegistry:
+    """
+    Several BIDS releases (e.g. cmi_bids_R1..R11) behind one merged recording index.
+    Each release keeps its own EEGSubjectData (and therefore its own index and cache);
+    listing, duration lookups and opening are spread across releases with a thread pool.
+    """
+
+    def __init__(self, roots, workers=8, **subject_kwargs):
+        roots = [Path(r) for r in roots]
+        self.workers = workers
+        subject_kwargs.setdefault("index", True)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            datasets = pool.map(lambda root: EEGSubjectData(root, **subject_kwargs), roots)
+            self._releases = {root.name: data for root, data in zip(roots, datasets)}
+        self._recordings = None
+        self._durations = {}
+
+    @classmethod
+    def from_base(cls, base_dir, releases=range(1, 12), **kwargs):
+        base_dir = Path(base_dir)
+        roots = [base_dir / f"cmi_bids_R{r}" for r in releases]
+        return cls([root for root in roots if root.is_dir()], **kwargs)
+
+    def releases(self):
+        return list(self._releases)
+
+    def release(self, name):
+        return self._releases[name]
+
+    def recordings(self):
+        if self._recordings is None:
+            frames = []
+            for name, data in self._releases.items():
+                if data.index is not None:
+                    rows = data.index.recordings()
+                else:
+                    rows = [{"subject": s, "task": t, "run": r} for s, t, r in data.iter_keys()]
+                frames.append(pd.DataFrame(rows).assign(release=name))
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            self._recordings = df
+        return self._recordings
+
+    def _duration(self, row):
+        key = (row["release"], row["subject"], row["task"], row["run"])
+        if key not in self._durations:
+            duration = _sidecar_duration(row["path"]) if row.get("path") else None
+            if duration is None:
+                # No sidecar: fall back to the EEGLAB header (metadata-only open, no signal).
+                duration = self.get_task(*key).duration
+            self._durations[key] = float(duration)
+        return self._durations[key]
+
+    def with_durations(self, df):
+        rows = df.to_dict("records")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            durations = list(pool.map(self._duration, rows))
+        return df.assign(duration=durations)
+
+    def query(self, task=None, run=None, subjects=None, releases=None, min_duration=None, max_duration=None):
+        """
+        e.g. query(task="surroundSupp", run=2) or query(task="RestingState", min_duration=300).
+        Returns a DataFrame with one row per recording; durations (seconds) are added when filtered on.
+        """
+        df = self.recordings()
+        if df.empty:
+            return df
+        mask = pd.Series(True, index=df.index)
+        if task is not None:
+            mask &= df["task"].isin([task] if isinstance(task, str) else task)
+        if run is not None:
+            mask &= df["run"] == str(run)
+        if subjects is not None:
+            mask &= df["subject"].isin(subjects)
+        if releases is not None:
+            mask &= df["release"].isin(releases)
+        df = df[mask]
+
+        if min_duration is not None or max_duration is not None:
+            df = self.with_durations(df)
+            if min_duration is not None:
+                df = df[df["duration"] > min_duration]
+            if max_duration is not None:
+                df = df[df["duration"] <= max_duration]
+        return df.reset_index(drop=True)
+
+    def keys(self, df):
+        return [(r["release"], r["subject"], r["task"], r["run"]) for r in df.to_dict("records")]
+
+    def get_task(self, release, subject, task, run=None):
+        return self._releases[release].get_task(subject, task, run)
+
+    def open_many(self, df):
+        """Open the header/sidecars of every selected recording concurrently."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(lambda key: self.get_task(*key), self.keys(df)))
@@ -0,0 +1,181 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+import hashlib
+import io
+import json
+import os
+import time
+import mne
+from .batch import BatchRunner
+from .cache import LRUCache
+from .subject import EEGSubjectData
+from .visualization import EEGVisualization
+
+RENDER_FORMATS = ("png", "svg")
+WORKER_CACHE_BYTES = 64 * 2 ** 20  # batch workers write images to disk; keep little in memory
+
+
+@contextmanager
+def _agg_backend():
+    """Draw with the non-interactive Agg backend, restoring the caller's backend (e.g. inline) afterwards."""
+    import matplotlib.pyplot as plt
+    previous = plt.get_backend()
+    if previous.lower() == "agg":
+        yield
+        return
+    plt.switch_backend("Agg")
+    try:
+        yield
+    finally:
+        plt.switch_backend(previous)
+
+
+class FigureRenderer:
+    """
+    Renders plot specs headlessly to PNG/SVG bytes (one image per figure the plot produces) and
+    caches them by a hash of (recording fingerprint, plot type, effective params, format, dpi):
+    in an in-memory LRU and, with cache_dir, as files that survive restarts and can be filled by
+    a batch run (FigureRendering) ahead of time.
+    """
+
+    def __init__(self, visualizer: EEGVisualization, cache_dir=None, fmt="png", dpi=100, cache=None):
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"fmt must be one of {RENDER_FORMATS}, got {fmt!r}")
+        self.visualizer = visualizer
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.fmt = fmt
+        self.dpi = dpi
+        self._cache = cache if cache is not None else LRUCache()
+
+    def _params(self, plot_type, kwargs):
+        params = self.visualizer._filter_params(plot_type, kwargs)
+        # Dropdown defaults are the option lists, not values; only an explicit choice is a parameter.
+        spec_params = self.visualizer.plot_specs[plot_type]["params"]
+        for name, meta in spec_params.items():
+            if meta["type"] == "dropdown":
+                params[name] = kwargs.get(name)
+        return params
+
+    def key(self, subject, task, run, plot_type, **kwargs):
+        import matplotlib  # deferred, like pyplot below: ~0.5 s of the module's import time
+        task_data = self.visualizer.data.get_task(subject, task, run)
+        payload = json.dumps({
+            "source": task_data._source_fingerprint(),
+            # Same recording, different signal: float32 data or another filter path can change the figure.
+            "precision": task_data.precision,
+            "filter_mode": task_data.filter_mode,
+            "plot_type": plot_type,
+            "params": self._params(plot_type, kwargs),
+            "format": self.fmt,
+            "dpi": self.dpi,
+            "mne": mne.__version__,
+            "matplotlib": matplotlib.__version__,
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _paths(self, key):
+        directory = self.cache_dir / key[:2]
+        return directory / f"{key}.json", lambda i: directory / f"{key}-{i}.{self.fmt}"
+
+    def _read(self, key):
+        images = self._cache.get(("figure", key))
+        if images is not None or self.cache_dir is None:
+            return images
+        manifest_path, image_path = self._paths(key)
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        images = tuple(image_path(i).read_bytes() for i in range(manifest["count"]))
+        return self._cache.put(("figure", key), images)
+
+    def _write(self, key, images, **manifest):
+        self._cache.put(("figure", key), images)
+        if self.cache_dir is None:
+            return
+        manifest_path, image_path = self._paths(key)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        for i, image in enumerate(images):
+            tmp = image_path(i).with_name(f"{image_path(i).name}.{os.getpid()}.tmp")
+            tmp.write_bytes(image)
+            os.replace(tmp, image_path(i))
+        # Manifest last: an entry only exists once all its images are on disk.
+        tmp = manifest_path.with_name(f"{manifest_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"count": len(images), "format": self.fmt, **manifest}, f, indent=2, default=str)
+        os.replace(tmp, manifest_path)
+
+    def cached(self, subject, task, run, plot_type, **kwargs):
+        """Cached images for this plot, or None without rendering."""
+        return self._read(self.key(subject, task, run, plot_type, **kwargs))
+
+    def render(self, subject, task, run, plot_type, **kwargs):
+        """
+        Tuple of image bytes for one plot spec (empty if the plot produced no figure, e.g. no epochs).
+        Figures are drawn with the matplotlib browser on the Agg backend, saved and closed; nothing
+        is shown, whatever backend the caller (e.g. a notebook) has active.
+        """
+        key = self.key(subject, task, run, plot_type, **kwargs)
+        images = self._read(key)
+        if images is not None:
+            return images
+
+        import matplotlib.pyplot as plt
+        params = self._params(plot_type, kwargs)
+        function = self.visualizer.plot_specs[plot_type]["function"]
+        images = []
+        with _agg_backend(), mne.viz.use_browser_backend("matplotlib"), self.visualizer.capture() as figures:
+            try:
+                function(subject, task, run, **params)
+                for fig in figures:
+                    buffer = io.BytesIO()
+                    fig.savefig(buffer, format=self.fmt, dpi=self.dpi)
+                    images.append(buffer.getvalue())
+            finally:
+                for fig in figures:
+                    plt.close(fig)
+        images = tuple(images)
+        self._write(key, images, subject=subject, task=task, run=run, plot_type=plot_type, params=params)
+        return images
+
+
+@lru_cache(maxsize=1)
+def _worker_renderer(data_dir, out_dir, fmt, dpi):
+    # One subject index and renderer per worker process, reused across the keys it is given.
+    visualizer = EEGVisualization(EEGSubjectData(data_dir))
+    return FigureRenderer(visualizer, cache_dir=out_dir, fmt=fmt, dpi=dpi, cache=LRUCache(max_bytes=WORKER_CACHE_BYTES))
+
+
+def render_key(data_dir, out_dir, subject, task, run, plots, fmt="png", dpi=100):
+    """
+    Batch job: render every (plot_type, kwargs) in `plots` for one recording into the figure
+    cache under out_dir. The recording is dropped from the worker's cache afterwards, so memory
+    stays flat over a whole release.
+    """
+    start = time.perf_counter()
+    renderer = _worker_renderer(str(data_dir), str(out_dir), fmt, dpi)
+    outputs = []
+    try:
+        for plot_type, kwargs in plots:
+            images = renderer.render(subject, task, run, plot_type, **kwargs)
+            outputs.append({"plot_type": plot_type, "params": kwargs, "count": len(images),
+                            "key": renderer.key(subject, task, run, plot_type, **kwargs)})
+    finally:
+        renderer.visualizer.data.clear_cache()
+    return {"status": "ok", "outputs": outputs, "seconds": time.perf_counter() - start}
+
+
+class FigureRendering(BatchRunner):
+    """
+    Pre-render plot specs for many recordings into a FigureRenderer cache directory, one worker
+    process per recording (matplotlib is not thread-safe). `plots` is a list of plot types or
+    (plot_type, kwargs) pairs; an EEGUI whose controller has a FigureRenderer on the same
+    directory then shows these images without re-plotting.
+    """
+
+    def __init__(self, data_dir, out_dir, plots=("sensors", "time", "frequency"), fmt="png", dpi=100, workers=None,
+                 profile=False):
+        plots = [[p, {}] if isinstance(p, str) else [p[0], dict(p[1])] for p in plots]
+        super().__init__(render_key, data_dir, out_dir, workers=workers, status_dir=Path(out_dir) / "_status",
+                         profile=profile, plots=plots, fmt=fmt, dpi=dpi)
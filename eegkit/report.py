@@ -0,0 +1,153 @@
+from html import escape
+from pathlib import Path
+import io
+import json
+import os
+import time
+from matplotlib.image import thumbnail
+import numpy as np
+import pandas as pd
+from .batch import BatchRunner, key_stem
+from .rendering import _worker_renderer
+
+REPORT_PLOTS = ("sensors", "time", "frequency", "conditionwise psd", "evoked")
+
+
+def _records(df):
+    # JSON-safe rows (numpy arrays/scalars become lists/str) for the status file.
+    if df is None:
+        return None
+    return json.loads(df.to_json(orient="records", default_handler=lambda v: np.asarray(v).tolist()))
+
+
+def report_key(data_dir, out_dir, subject, task, run, plots, l_freq=1.0, h_freq=50.0, dpi=100, thumb_scale=0.2):
+    """
+    Batch job: render the QC plots of one recording as PNGs (full size under figures/, through the
+    FigureRenderer cache, and scaled under thumbs/) and summarize its epochs with
+    show_table('epochs'). Returns paths relative to out_dir for the HTML page.
+    """
+    start = time.perf_counter()
+    out_dir = Path(out_dir)
+    renderer = _worker_renderer(str(data_dir), str(out_dir / "figures"), "png", dpi)
+    visualizer = renderer.visualizer
+    thumbs_dir = out_dir / "thumbs"
+    thumbs_dir.mkdir(parents=True, exist_ok=True)
+
+    figures = []
+    try:
+        for plot_type, kwargs in plots:
+            kwargs = {"l_freq": l_freq, "h_freq": h_freq, **kwargs}
+            entry = {"plot_type": plot_type, "label": visualizer.plot_specs[plot_type]["label"],
+                     "images": [], "thumbs": []}
+            figures.append(entry)
+            try:
+                images = renderer.render(subject, task, run, plot_type, **kwargs)
+            except Exception as exc:  # one broken plot should not hide the recording's other plots
+                entry["error"] = repr(exc)
+                continue
+            key = renderer.key(subject, task, run, plot_type, **kwargs)
+            _, image_path = renderer._paths(key)
+            for i, image in enumerate(images):
+                thumb = thumbs_dir / f"{key}-{i}.png"
+                if not thumb.exists():
+                    tmp = thumb.with_name(f".{thumb.name}.{os.getpid()}.png")
+                    thumbnail(io.BytesIO(image), tmp, scale=thumb_scale)
+                    os.replace(tmp, thumb)
+                entry["images"].append(str(image_path(i).relative_to(out_dir)))
+                entry["thumbs"].append(str(thumb.relative_to(out_dir)))
+
+        task_data = visualizer.data.get_task(subject, task, run)
+        epochs_table = _records(task_data.show_table('epochs', l_freq=l_freq, h_freq=h_freq))
+    finally:
+        visualizer.data.clear_cache()
+
+    return {"status": "ok", "figures": figures, "epochs": epochs_table, "seconds": time.perf_counter() - start}
+
+
+def _section(status):
+    name = key_stem(status["subject"], status["task"], status["run"])
+    parts = [f'<section id="{escape(name)}"><h2>{escape(name)}</h2>']
+    if status.get("status") != "ok":
+        parts.append(f'<p class="error">{escape(status.get("status", "missing"))}: '
+                     f'{escape(str(status.get("error", "")))}</p>')
+    if status.get("epochs"):
+        parts.append(pd.DataFrame(status["epochs"]).to_html(index=False, border=0))
+    elif status.get("status") == "ok":
+        parts.append("<p>No epochs for this task.</p>")
+    for figure in status.get("figures", []):
+        if figure.get("error"):
+            parts.append(f'<p class="error">{escape(figure["label"])}: {escape(figure["error"])}</p>')
+        for image, thumb in zip(figure["images"], figure["thumbs"]):
+            parts.append(f'<figure><a href="{escape(image)}"><img src="{escape(thumb)}" loading="lazy"></a>'
+                         f'<figcaption>{escape(figure["label"])}</figcaption></figure>')
+    parts.append("</section>")
+    return "\n".join(parts)
+
+
+def write_report(path, statuses, title="EEG QC report"):
+    """Static HTML page: an overview table linking to one section (epochs summary + thumbnails) per recording."""
+    overview = pd.DataFrame([{
+        "recording": f'<a href="#{escape(key_stem(s["subject"], s["task"], s["run"]))}">'
+                     f'{escape(key_stem(s["subject"], s["task"], s["run"]))}</a>',
+        "status": s.get("status", "missing"),
+        "n_epochs": (s.get("epochs") or [{}])[0].get("n_epochs"),
+        "figures": sum(len(f["images"]) for f in s.get("figures", [])),
+    } for s in statuses])
+    body = "\n".join(_section(s) for s in statuses)
+    html = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+figure {{ display: inline-block; margin: 0.5em; text-align: center; }}
+table {{ border-collapse: collapse; }} td, th {{ padding: 0.2em 0.6em; border-bottom: 1px solid #ddd; }}
+.error {{ color: #b00; }}
+</style></head>
+<body><h1>{escape(title)}</h1>
+{overview.to_html(index=False, escape=False, border=0)}
+{body}
+</body></html>
+"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(html)
+    os.replace(tmp, path)
+    return path
+
+
+class QCReport(BatchRunner):
+    """
+    QC report over many recordings from the plot specs: each recording is rendered in its own
+    worker process (matplotlib is not thread-safe), workers are recycled every
+    `max_tasks_per_child` recordings so memory stays flat across hundreds of subjects (Python 3.11+,
+    see BatchRunner), and finished recordings are skipped when a report is rebuilt.
+    """
+
+    def __init__(self, data_dir, out_dir, plots=REPORT_PLOTS, l_freq=1.0, h_freq=50.0, dpi=100, thumb_scale=0.2,
+                 workers=None, max_tasks_per_child=20, profile=False):
+        plots = [[p, {}] if isinstance(p, str) else [p[0], dict(p[1])] for p in plots]
+        super().__init__(report_key, data_dir, out_dir, workers=workers, status_dir=Path(out_dir) / "_status",
+                         max_tasks_per_child=max_tasks_per_child, profile=profile, plots=plots, l_freq=l_freq, h_freq=h_freq,
+                         dpi=dpi, thumb_scale=thumb_scale)
+
+    def _status(self, key):
+        path = self._status_path(*key)
+        if not path.exists():
+            subject, task, run = key
+            return {"subject": subject, "task": task, "run": run, "status": "missing"}
+        with open(path) as f:
+            return json.load(f)
+
+    def build(self, keys, title=None, log=print):
+        """
+        Render every key (resuming), then write <out_dir>/index.html. Returns the run summary
+        (ok/unsupported/error counts, see BatchRunner.run) plus the report `path` and `plot_errors`,
+        the number of single plots that failed inside otherwise finished recordings.
+        """
+        keys = list(keys)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.run(keys, log=log)
+        statuses = [self._status(k) for k in keys]
+        path = write_report(self.out_dir / "index.html", statuses,
+                            title=title or f"EEG QC report — {self.data_dir.name}")
+        log(f"Report written to {path}")
+        plot_errors = sum(1 for s in statuses for figure in s.get("figures", []) if figure.get("error"))
+        return {**summary, "plot_errors": plot_errors, "path": path}
@@ -0,0 +1,108 @@
+import mne
+from mne.annotations import _annotations_starts_stops
+from mne.time_frequency import SpectrumArray
+import numpy as np
+from .cache import LRUCache
+
+# Matches mne's compute_psd(method="welch") defaults: 256-sample Hamming segments, no overlap, no detrend.
+WELCH_DEFAULTS = {"n_fft": 256, "n_overlap": 0, "window": "hamming"}
+
+
+def welch_psd(data, sfreq, fmin, fmax, n_fft=256, n_overlap=0, window="hamming"):
+    """
+    Welch PSD over the last axis of an array of any leading shape, e.g. (epochs, channels, times),
+    in one batched FFT. Returns (psd restricted to [fmin, fmax], freqs).
+    """
+    from scipy.signal import welch  # deferred: scipy.signal takes ~1 s to import
+    n_fft = min(n_fft, data.shape[-1])
+    freqs, psd = welch(
+        data, fs=sfreq, window=window, nperseg=n_fft, noverlap=min(n_overlap, n_fft - 1),
+        nfft=n_fft, detrend=False, scaling="density", average="mean", axis=-1
+    )
+    mask = (freqs >= fmin) & (freqs <= fmax)
+    return psd[..., mask], freqs[mask]
+
+
+def good_picks(info):
+    """Data channels not in info['bads'], the channels mne's compute_psd uses by default."""
+    return mne.pick_types(info, meg=True, eeg=True, seeg=True, ecog=True, dbs=True, exclude="bads")
+
+
+def welch_psd_spans(data, spans, sfreq, fmin, fmax, picks=None, n_fft=256, n_overlap=0, window="hamming"):
+    """
+    welch_psd of the (channels, times) data restricted to the [start, stop) sample spans, averaging
+    every Welch segment that fits inside a span. This is what mne's reject_by_annotation does to
+    'bad' segments. Channels are picked one span at a time, so the full array is never copied.
+    """
+    n_overlap = min(n_overlap, n_fft - 1)
+    total, count, freqs = 0.0, 0, None
+    for start, stop in spans:
+        if stop - start < n_fft:
+            continue  # no whole segment fits
+        n_segments = (stop - start - n_overlap) // (n_fft - n_overlap)
+        span = data[:, start:stop] if picks is None else data[picks, start:stop]
+        psd, freqs = welch_psd(span, sfreq, fmin, fmax, n_fft=n_fft, n_overlap=n_overlap, window=window)
+        total = total + psd * n_segments
+        count += n_segments
+    if count == 0:
+        return welch_psd(data if picks is None else data[picks], sfreq, fmin, fmax, n_fft=n_fft,
+                         n_overlap=n_overlap, window=window)
+    return total / count, freqs
+
+
+class SpectralEngine:
+    """
+    Computes and caches Welch spectra as mne SpectrumArray objects, so display-only options
+    (dB, average, spatial_colors) re-render from the cached spectrum without recomputation.
+    Keys are (recording key..., "psd", kind, fmin, fmax, window params...).
+    """
+
+    def __init__(self, cache=None, **welch_params):
+        self._cache = cache if cache is not None else LRUCache()
+        self.welch_params = {**WELCH_DEFAULTS, **welch_params}
+
+    def _key(self, recording_key, kind, *params):
+        return tuple(recording_key) + ("psd", kind) + params + tuple(sorted(self.welch_params.items()))
+
+    def raw_spectrum(self, recording_key, raw, fmin, fmax):
+        key = self._key(recording_key, "raw", fmin, fmax)
+        spectrum = self._cache.get(key)
+        if spectrum is None:
+            # Like raw.compute_psd(): bad channels are left out and BAD_* annotated spans skipped.
+            picks = good_picks(raw.info)
+            spans = zip(*_annotations_starts_stops(raw, "bad", invert=True))
+            psd, freqs = welch_psd_spans(raw._data, spans, raw.info["sfreq"], fmin, fmax, picks=picks,
+                                         **self.welch_params)
+            spectrum = self._cache.put(key, SpectrumArray(psd, mne.pick_info(raw.info, picks), freqs, verbose=False))
+        return spectrum
+
+    def condition_spectra(self, recording_key, epochs, fmin, fmax, tmin=None, tmax=None):
+        """
+        {condition: SpectrumArray of the epoch-averaged PSD} for every condition in epochs.event_id,
+        from one Welch pass over the stacked (epochs, channels, times) array cropped to [tmin, tmax].
+        Conditions without epochs are omitted.
+        """
+        key = self._key(recording_key, "conditions", fmin, fmax, tmin, tmax)
+        spectra = self._cache.get(key)
+        if spectra is not None:
+            return spectra
+
+        times = epochs.times
+        mask = np.ones(len(times), bool)
+        if tmin is not None:
+            mask &= times >= tmin
+        if tmax is not None:
+            mask &= times <= tmax
+
+        picks = good_picks(epochs.info)  # bad spans were already dropped when epoching
+        info = mne.pick_info(epochs.info, picks)
+        data = epochs.get_data()[:, picks][..., mask]
+        psd, freqs = welch_psd(data, epochs.info["sfreq"], fmin, fmax, **self.welch_params)
+
+        codes = epochs.events[:, 2]
+        spectra = {}
+        for condition, code in epochs.event_id.items():
+            selected = codes == code
+            if selected.any():
+                spectra[condition] = SpectrumArray(psd[selected].mean(axis=0), info, freqs, verbose=False)
+        return self._cache.put(key, spectra)
@@ -0,0 +1,105 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import mne
+import numpy as np
+
+
+def source_fingerprint(*paths):
+    """Path/mtime/size of every existing source file; changes whenever the recording is rewritten."""
+    entries = []
+    for path in paths:
+        path = Path(path)
+        if path.exists():
+            st = path.stat()
+            entries.append({"path": str(path.resolve()), "mtime_ns": st.st_mtime_ns, "size": st.st_size})
+    return entries
+
+
+def raw_from_array(data, info, template):
+    """
+    Wrap an array (possibly an np.memmap) as a preloaded Raw sharing the template's timing and annotations.
+    RawArray copies anything but float64 into a new float64 array, so other dtypes (precision="float32")
+    are attached after construction, which is given a zero-stride float64 placeholder instead.
+    """
+    if data.dtype == np.float64:
+        raw = mne.io.RawArray(data, info, first_samp=template.first_samp, verbose=False)
+    else:
+        placeholder = np.broadcast_to(np.float64(0), data.shape)
+        raw = mne.io.RawArray(placeholder, info, first_samp=template.first_samp, verbose=False)
+        raw._data = data
+    raw.set_annotations(template.annotations)
+    return raw
+
+
+class SignalStore:
+    """
+    On-disk store of signal arrays as <key>.npy + <key>-info.fif + <key>.json manifest.
+    The manifest is written last, so an entry only exists once it is complete.
+    Arrays are opened memory-mapped, so a restarted kernel reuses them without recomputing.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def key(self, source, **params):
+        payload = json.dumps({"source": source, "mne": mne.__version__, **params}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _paths(self, key):
+        return self.root / f"{key}.npy", self.root / f"{key}-info.fif", self.root / f"{key}.json"
+
+    def __contains__(self, key):
+        return self._paths(key)[2].exists()
+
+    def load(self, key, mmap_mode="c"):
+        """Return (data, info, manifest) or None. mmap_mode='c' keeps writes private to the process."""
+        data_path, info_path, manifest_path = self._paths(key)
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        data = np.load(data_path, mmap_mode=mmap_mode)
+        info = mne.io.read_info(info_path, verbose=False)
+        return data, info, manifest
+
+    def _tmp(self, key):
+        # Per-process/thread temp names so concurrent writers of the same entry don't clobber each other.
+        return self.root / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def save(self, key, data, info, manifest=None):
+        with open(f"{self._tmp(key)}.npy", "wb") as f:
+            np.save(f, data)
+        self._commit(key, data.shape, data.dtype, info, manifest)
+
+    def create(self, key, shape, dtype=np.float64):
+        """Writable np.memmap for streaming an entry to disk block by block; finish with commit()."""
+        # Plain ints: numpy 2 writes np.int64 dims into the .npy header as "np.int64(n)", which np.load rejects.
+        shape = tuple(int(n) for n in shape)
+        return np.lib.format.open_memmap(f"{self._tmp(key)}.npy", mode="w+", dtype=dtype, shape=shape)
+
+    def commit(self, key, data, info, manifest=None):
+        data.flush()
+        self._commit(key, data.shape, data.dtype, info, manifest)
+
+    def _commit(self, key, shape, dtype, info, manifest):
+        data_path, info_path, manifest_path = self._paths(key)
+        tmp = self._tmp(key)
+        os.replace(f"{tmp}.npy", data_path)
+
+        tmp_info = Path(f"{tmp}-info.fif")
+        tmp_info.unlink(missing_ok=True)
+        mne.io.write_info(tmp_info, info)
+        os.replace(tmp_info, info_path)
+
+        manifest = dict(manifest or {}, shape=[int(n) for n in shape], dtype=str(dtype))
+        with open(f"{tmp}.json", "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(f"{tmp}.json", manifest_path)
+
+    def remove(self, key):
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
@@ -1,24 +1,49 @@
 from pathlib import Path
-import re
 from collections import defaultdict
-from .task import EEGTaskData
+from threading import Lock
+from .cache import LRUCache
+from .index import DatasetIndex, EEG_FILE_PATTERN
+from .profiling import span
 
 
 class EEGSubjectData:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, preload=False, max_bytes=None, cache_dir=None, mmap=False, index=None,
+                 filter_mode="direct", block_size=None, precision="float64"):
         self._data_dir = Path(data_dir)
-        self._subject_ids = self._discover_subjects()
-        self._task_index = self._discover_tasks()
-        self._cache = {}  # (subj, task, run) → EEGTaskData
+        self._preload = preload
+        self._filter_mode = filter_mode
+        self._block_size = block_size
+        self._precision = precision  # "float32" halves resident signal memory (see EEGTaskData)
+
+        # index: None → glob the tree; True → persisted index at the default path; str/Path → index file
+        self._index = None
+        if index:
+            self._index = DatasetIndex(self._data_dir, None if index is True else index)
+            self._index.refresh()
+            self._subject_ids = self._index.subjects()
+            self._task_index = self._index.task_map()
+        else:
+            self._subject_ids = self._discover_subjects()
+            self._task_index = self._discover_tasks()
+
+        # One byte-bounded LRU shared by task data, filtered raws and epochs.
+        # (subj, task, run) → EEGTaskData; (subj, task, run, kind, ...) → derived data
+        self._cache = LRUCache(max_bytes=max_bytes)
+        # One lock per recording, so concurrent get_task calls (e.g. EEGUI prefetch) build it once.
+        self._task_locks = {}
+        self._task_locks_lock = Lock()
+        self._store = None
+        if cache_dir is not None:
+            from .store import SignalStore  # mne is only needed once signals are touched
+            self._store = SignalStore(cache_dir)
+        self._mmap = mmap
 
     def _discover_subjects(self):
         return sorted([p.name for p in self._data_dir.glob("sub-*") if p.is_dir()])
 
     def _discover_tasks(self):
         task_map = defaultdict(list)
-        pattern = re.compile(
-            r"(sub-(?P<subject>[^_]+))_task-(?P<task>[^_]+)(?:_run-(?P<run>\d+))?_eeg\.set"
-        )
+        pattern = EEG_FILE_PATTERN
 
         for subj_dir in self._data_dir.glob("sub-*"):
             eeg_dir = subj_dir / "eeg"
@@ -35,20 +60,59 @@ class EEGSubjectData:
 
         return dict(task_map)
 
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def index(self):
+        return self._index
+
     def list_subjects(self):
         return self._subject_ids
 
     def list_tasks(self, subject):
         return sorted(self._task_index.get(subject, []))
 
+    def iter_keys(self, tasks=None):
+        for subject in self._subject_ids:
+            for task, run in self.list_tasks(subject):
+                if tasks is None or task in tasks:
+                    yield subject, task, run
+
     def get_task(self, subject, task, run=None):
         key = (subject, task, run)
-        if key not in self._cache:
+        with self._task_locks_lock:
+            lock = self._task_locks.setdefault(key, Lock())
+        with span("get_task", subject=subject, task=task, run=run) as s, lock:
+            task_data = self._cache.get(key)
+            if task_data is not None:
+                s.hit()
+                return task_data
+            s.miss()
+            from .task import EEGTaskData  # deferred: imports mne/pandas/scipy on first recording
             task_data = EEGTaskData(
                 subject=subject,
                 task=task,
                 run=run,
                 data_dir=self._data_dir,
+                preload=self._preload,
+                cache=self._cache,
+                store=self._store,
+                mmap=self._mmap,
+                filter_mode=self._filter_mode,
+                block_size=self._block_size,
+                precision=self._precision,
             )
-            self._cache[key] = task_data
-        return self._cache[key]
\ No newline at end of file
+            self._cache.put(key, task_data)
+            return task_data
+
+    def release(self, subject, task, run=None):
+        """Drop a recording and everything derived from it (filtered raws, epochs, spectra) from the cache."""
+        return self._cache.pop_prefix((subject, task, run))
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+    def clear_cache(self):
+        self._cache.clear()
\ No newline at end of file
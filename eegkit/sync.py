@@ -0,0 +1,246 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from threading import Lock
+import hashlib
+import json
+import os
+import time
+
+HBN_BUCKET = "fcp-indi"
+HBN_PREFIX = "data/Projects/HBN/BIDS_EEG"  # + /cmi_bids_R<n>
+DEFAULT_PART_SIZE = 8 * 2 ** 20  # also boto3's multipart chunk size, so most multipart ETags can be verified
+MANIFEST_NAME = "sync-manifest.json"
+_STATE_NAME = ".eegkit-sync.json"
+
+
+def anonymous_client(max_pool_connections=32):
+    """Unsigned S3 client for the public HBN bucket, with enough connections for the worker pool."""
+    import boto3  # only for the default client: S3Sync(client=...) works without boto3 installed
+    from botocore import UNSIGNED
+    from botocore.config import Config
+    return boto3.client("s3", config=Config(signature_version=UNSIGNED, max_pool_connections=max_pool_connections))
+
+
+def _md5(path, start=0, length=None, block=2 ** 20):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = f.read(block if remaining is None else min(block, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest
+
+
+def etag_matches(path, etag, size, part_size=DEFAULT_PART_SIZE):
+    """
+    Verify a local file against an S3 ETag: True/False, or None when it cannot be checked (multipart
+    upload with a part size other than part_size, or an SSE-KMS style ETag).
+    Single-part ETags are the MD5 of the object; multipart ones the MD5 of the part MD5s, '-<parts>'.
+    """
+    etag = etag.strip('"')
+    if "-" not in etag:
+        return _md5(path).hexdigest() == etag
+    digest, n_parts = etag.rsplit("-", 1)
+    if -(-size // part_size) != int(n_parts):
+        return None
+    parts = b"".join(_md5(path, start, part_size).digest() for start in range(0, size, part_size))
+    return hashlib.md5(parts).hexdigest() == digest
+
+
+class S3Sync:
+    """
+    Mirror an S3 prefix into a local directory.
+
+    Objects are fetched as byte ranges of part_size over one bounded thread pool shared by all
+    files, written into <file>.part at their offsets. Completed parts are recorded in
+    <file>.part.json, so an interrupted sync resumes where it stopped (unless the object changed).
+    Finished files are verified against their ETag before being moved into place. Files whose size
+    and ETag match the last sync are skipped. Each run writes a manifest (sync-manifest.json) listing
+    every object and what changed, which DatasetIndex.refresh(subjects=...) can consume.
+
+    Pass `client` to use any boto3-compatible S3 client (e.g. a moto or MinIO endpoint).
+    """
+
+    def __init__(self, prefix, local_dir, bucket=HBN_BUCKET, client=None, workers=16, part_size=DEFAULT_PART_SIZE,
+                 verify=True):
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+        self.local_dir = Path(local_dir)
+        self.workers = workers
+        self.client = client if client is not None else anonymous_client(max_pool_connections=workers)
+        self.part_size = part_size
+        self.verify = verify
+        self._state_path = self.local_dir / _STATE_NAME
+        self._lock = Lock()
+
+    @classmethod
+    def hbn_release(cls, release, local_dir, **kwargs):
+        return cls(f"{HBN_PREFIX}/cmi_bids_R{release}", local_dir, **kwargs)
+
+    def list_objects(self, prefix=None):
+        paginator = self.client.get_paginator("list_objects_v2")
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=(prefix or self.prefix) + "/"):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith("/"):
+                    continue
+                objects.append({
+                    "key": obj["Key"],
+                    "path": str(PurePosixPath(obj["Key"]).relative_to(self.prefix)),
+                    "size": obj["Size"],
+                    "etag": obj["ETag"].strip('"'),
+                    "last_modified": obj["LastModified"].isoformat(),
+                })
+        return objects
+
+    # -- local state ----------------------------------------------------------------------------
+
+    def _read_json(self, path, default):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    def _write_json(self, path, payload):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp, path)
+
+    def _is_current(self, obj, state):
+        path = self.local_dir / obj["path"]
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return False
+        if st.st_size != obj["size"]:
+            return False
+        known = state.get(obj["path"])
+        if known is not None:
+            return known["etag"] == obj["etag"] and known["mtime_ns"] == st.st_mtime_ns
+        # Not synced by us (e.g. by legacy/boto.py): adopt it if its content matches the ETag.
+        adopted = bool(etag_matches(path, obj["etag"], obj["size"], self.part_size)) if self.verify else True
+        if adopted:
+            state[obj["path"]] = {"etag": obj["etag"], "size": obj["size"], "mtime_ns": st.st_mtime_ns}
+        return adopted
+
+    # -- downloading ----------------------------------------------------------------------------
+
+    def _plan(self, obj):
+        """Byte ranges still missing from <file>.part, resetting it if the object changed since."""
+        path = self.local_dir / obj["path"]
+        part, progress_path = path.with_name(path.name + ".part"), path.with_name(path.name + ".part.json")
+        ranges = [(start, min(start + self.part_size, obj["size"]) - 1) for start in range(0, obj["size"], self.part_size)]
+        progress = self._read_json(progress_path, {})
+        if progress.get("etag") != obj["etag"] or progress.get("part_size") != self.part_size or not part.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(part, "wb") as f:
+                f.truncate(obj["size"])
+            progress = {"etag": obj["etag"], "part_size": self.part_size, "done": []}
+            self._write_json(progress_path, progress)
+        done = set(progress["done"])
+        return [(i, r) for i, r in enumerate(ranges) if i not in done], progress
+
+    def _fetch(self, obj, index, byte_range, progress):
+        path = self.local_dir / obj["path"]
+        start, end = byte_range
+        # IfMatch: fail instead of mixing parts of two versions when the object changes mid-sync.
+        response = self.client.get_object(Bucket=self.bucket, Key=obj["key"], Range=f"bytes={start}-{end}",
+                                          IfMatch=f'"{obj["etag"]}"')
+        body = response["Body"].read()
+        if len(body) != end - start + 1:
+            raise IOError(f"{obj['key']}: got {len(body)} bytes for range {start}-{end}")
+        fd = os.open(path.with_name(path.name + ".part"), os.O_WRONLY)
+        try:
+            os.pwrite(fd, body, start)
+        finally:
+            os.close(fd)
+        with self._lock:
+            progress["done"].append(index)
+            self._write_json(path.with_name(path.name + ".part.json"), progress)
+        return len(body)
+
+    def _finish(self, obj, state):
+        path = self.local_dir / obj["path"]
+        part = path.with_name(path.name + ".part")
+        if self.verify and etag_matches(part, obj["etag"], obj["size"], self.part_size) is False:
+            part.unlink()
+            path.with_name(path.name + ".part.json").unlink(missing_ok=True)
+            raise IOError(f"{obj['key']}: checksum does not match ETag {obj['etag']}")
+        os.replace(part, path)
+        path.with_name(path.name + ".part.json").unlink(missing_ok=True)
+        with self._lock:
+            state[obj["path"]] = {"etag": obj["etag"], "size": obj["size"], "mtime_ns": path.stat().st_mtime_ns}
+            # Saved per file, so a killed sync does not re-hash every finished file on the next run.
+            self._write_json(self._state_path, state)
+
+    def run(self, log=print):
+        """Sync everything under the prefix; returns the manifest (also written to local_dir)."""
+        start_time = time.perf_counter()
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        state = self._read_json(self._state_path, {})
+
+        objects = self.list_objects()
+        pending = [obj for obj in objects if not self._is_current(obj, state)]
+        total = sum(obj["size"] for obj in pending)
+        log(f"{len(objects)} objects, {len(objects) - len(pending)} up to date, "
+            f"{len(pending)} to download ({total / 2 ** 20:.1f} MiB) with {self.workers} workers")
+
+        errors = {}
+        downloaded = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="eegkit-sync") as pool:
+            remaining = {}  # object path → parts still in flight
+            futures = {}
+            for obj in pending:
+                parts, progress = self._plan(obj)
+                remaining[obj["path"]] = len(parts)
+                if not parts:
+                    futures[pool.submit(lambda: 0)] = obj  # every part already on disk: just finish
+                    remaining[obj["path"]] = 1
+                for index, byte_range in parts:
+                    futures[pool.submit(self._fetch, obj, index, byte_range, progress)] = obj
+
+            for future in as_completed(futures):
+                obj = futures[future]
+                if obj["path"] in errors:
+                    continue
+                try:
+                    downloaded += future.result()
+                    remaining[obj["path"]] -= 1
+                    if remaining[obj["path"]] == 0:
+                        self._finish(obj, state)
+                        log(f"[{downloaded / 2 ** 20:.1f}/{total / 2 ** 20:.1f} MiB] {obj['path']}")
+                except Exception as exc:  # the .part file keeps finished ranges for the next run
+                    errors[obj["path"]] = repr(exc)
+                    log(f"{obj['path']}: {exc!r}")
+
+        self._write_json(self._state_path, state)  # also records files adopted by _is_current
+        downloaded_paths = {obj["path"] for obj in pending}
+        manifest = {
+            "bucket": self.bucket,
+            "prefix": self.prefix,
+            "synced_at": datetime.now(timezone.utc).isoformat(),
+            "seconds": time.perf_counter() - start_time,
+            "files": [{**obj, "status": "error" if obj["path"] in errors
+                       else "downloaded" if obj["path"] in downloaded_paths else "current",
+                       **({"error": errors[obj["path"]]} if obj["path"] in errors else {})} for obj in objects],
+        }
+        self._write_json(self.local_dir / MANIFEST_NAME, manifest)
+        log(f"{len(pending) - len(errors)} downloaded, {len(errors)} failed "
+            f"in {manifest['seconds']:.1f}s")
+        return manifest
+
+
+def changed_subjects(manifest):
+    """Subjects with files downloaded by a sync, for DatasetIndex.refresh(subjects=...)."""
+    return sorted({
+        PurePosixPath(f["path"]).parts[0] for f in manifest["files"]
+        if f["status"] == "downloaded" and PurePosixPath(f["path"]).parts[0].startswith("sub-")
+    })
@@ -1,24 +1,60 @@
 import mne
-from mne import events_from_annotations, Epochs
 import json
+from threading import RLock
 import pandas as pd
 import numpy as np
+from .cache import LRUCache, nbytes_of, freeze
+from .store import source_fingerprint, raw_from_array
+from .filtering import (
+    FILTER_DESIGN, FILTER_MODES, DEFAULT_BLOCK_SIZE, PRECISIONS, filter_raw, filtered_info, is_bandpass,
+    combine_bandpass, stream_filter
+)
+from .events import compile_events
+from .overview import OverviewPyramid, PYRAMID_FACTORS
+from .preprocessors import get_preprocessor
+from .profiling import span
 
 class EEGTaskData:
-    def __init__(self, subject, task, run, data_dir):
+    def __init__(self, subject, task, run, data_dir, preload=False, cache=None, store=None, mmap=False,
+                 filter_mode="direct", block_size=None, precision="float64"):
         self.subject = subject
         self.task = task
         self.run = run
         self.data_dir = data_dir
+        self.preload = preload  # False → read header/sidecars only, signal on first use
 
         self._raw = None
-        self._filtered_cache = {}  # key = (l_freq, h_freq)
         self.metadata = {}
         self.events = None
         self.channels = None
         self.electrodes = None
 
-        self._epochs_cache = {}  # key: (l_freq, h_freq) → (epochs, labels)
+        # Filtered raws and epochs live in a (possibly shared) byte-bounded LRU cache,
+        # keyed by (subject, task, run, kind, *params).
+        self._cache = cache if cache is not None else LRUCache()
+        self._store = store  # optional SignalStore persisting filtered data across sessions
+        # mmap=True: the signal is converted once into the store and served as a read-only
+        # np.memmap, so every process opening the same recording shares its page cache.
+        self._mmap = mmap
+        if mmap and store is None:
+            raise ValueError("mmap=True requires a SignalStore (EEGSubjectData(cache_dir=...))")
+        # "incremental": band-passes are composed from cached single-edge stages (see filtering.py)
+        # "chunked": streamed block by block from the source into the store, never fully in memory
+        if filter_mode not in FILTER_MODES:
+            raise ValueError(f"filter_mode must be one of {FILTER_MODES}, got {filter_mode!r}")
+        if filter_mode == "chunked" and store is None:
+            raise ValueError("filter_mode='chunked' requires a SignalStore (EEGSubjectData(cache_dir=...))")
+        self.filter_mode = filter_mode
+        self.block_size = block_size or DEFAULT_BLOCK_SIZE
+        # "float32": the loaded signal, filtered copies, store entries and epochs are all float32
+        # (half the memory); filters read float64 blocks from the source file and round only their output.
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {tuple(PRECISIONS)}, got {precision!r}")
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+        self._compiled_events = {}  # (value, pattern, columns, formatter) → CompiledEvents
+        # Serializes loading and filtering, which EEGUI's prefetch threads run next to the UI thread.
+        self._lock = RLock()
 
         self._load()
 
@@ -33,142 +69,283 @@ class EEGTaskData:
 
     def _load(self):
         eeg_path = self._get_file("eeg.set")
-        self._raw = mne.io.read_raw_eeglab(eeg_path, preload=True, montage_units='cm')
-        montage = mne.channels.make_standard_montage("GSN-HydroCel-128")
-        self._raw.drop_channels(['Cz'])
-        self._raw.set_montage(montage, match_case=False)
+        # mmap and float32 signals are read by _ensure_loaded instead of MNE's float64 preload.
+        eager = self.preload and not self._mmap and self.dtype == np.float64
+        with span("read_raw_eeglab", preload=eager):
+            self._raw = mne.io.read_raw_eeglab(eeg_path, preload=eager, montage_units='cm')
+        with span("set_montage"):
+            montage = mne.channels.make_standard_montage("GSN-HydroCel-128")
+            self._raw.drop_channels(['Cz'])
+            self._raw.set_montage(montage, match_case=False)
+        self._source = self._raw  # as opened; float32 filtering without mmap reads float64 blocks from it
         # self._raw.filter(l_freq=self.l_freq, h_freq=self.h_freq)
 
-        json_path = self._get_file("eeg.json")
-        if json_path.exists():
-            with open(json_path) as f:
-                self.metadata = json.load(f)
+        with span("read_sidecars"):
+            json_path = self._get_file("eeg.json")
+            if json_path.exists():
+                with open(json_path) as f:
+                    self.metadata = json.load(f)
+
+            event_path = self._get_file("events.tsv")
+            if event_path.exists():
+                self.events = pd.read_csv(event_path, sep='\t')
+
+            channels_path = self._get_file("channels.tsv")
+            if channels_path.exists():
+                self.channels = pd.read_csv(channels_path, sep='\t')
+
+            electrodes_path = self._get_file("electrodes.tsv")
+            if electrodes_path.exists():
+                self.electrodes = pd.read_csv(electrodes_path, sep='\t')
+
+        if self.preload and not eager:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._raw.preload:
+                return self._raw
+            with span("load_data", mmap=self._mmap) as s:
+                if self._mmap:
+                    self._raw = self._open_mmap_raw()
+                elif self.dtype != np.float64:
+                    self._raw = raw_from_array(self._read_signal(), self._raw.info, self._raw)
+                else:
+                    self._raw.load_data()
+                s.held(self._raw)
+            freeze(self._raw)  # shared by every filtered copy and epoching variant
+            self._cache.evict()  # account for the newly resident signal
+            return self._raw
+
+    def _read_signal(self, out=None):
+        """Read the source block by block into `out` (default: a new array of self.dtype), casting each block."""
+        header = self._source
+        if out is None:
+            out = np.empty((len(header.ch_names), header.n_times), dtype=self.dtype)
+        for start in range(0, header.n_times, self.block_size):
+            stop = min(start + self.block_size, header.n_times)
+            out[:, start:stop] = header.get_data(start=start, stop=stop)
+        return out
+
+    def _open_mmap_raw(self):
+        key = self._store_key("raw")
+        if key not in self._store:
+            # First open on this machine: convert .set/.fdt once, then drop the private copy.
+            if self.dtype != np.float64:
+                out = self._store.create(key, (len(self._raw.ch_names), self._raw.n_times), dtype=self.dtype)
+                self._read_signal(out)
+                self._store.commit(key, out, self._raw.info,
+                                   dict(subject=self.subject, task=self.task, run=self.run))
+                del out
+            else:
+                raw = self._raw.copy().load_data()
+                self._save_to_store(key, raw, subject=self.subject, task=self.task, run=self.run)
+                del raw
+        data, info, _ = self._store.load(key, mmap_mode="r")
+        return raw_from_array(data, info, self._raw)
+
+    def _cache_key(self, kind, *params):
+        # Floats and ints compare equal in tuples, so 1 and 1.0 share an entry.
+        # A shared LRU may hold both precisions of a recording, so non-default ones are part of the key.
+        if self.precision != "float64":
+            params += (self.precision,)
+        return (self.subject, self.task, self.run, kind) + params
+
+    @property
+    def nbytes(self):
+        return nbytes_of(self._raw._data) if self.is_loaded else 0
+
+    @property
+    def is_loaded(self):
+        return self._raw is not None and self._raw.preload
+
+    def get_header(self):
+        """The Raw as opened; its signal may not be loaded yet."""
+        return self._raw
 
-        event_path = self._get_file("events.tsv")
-        if event_path.exists():
-            self.events = pd.read_csv(event_path, sep='\t')
+    @property
+    def annotations(self):
+        return self._raw.annotations
+
+    @property
+    def duration(self):
+        return self._raw.n_times / self._raw.info["sfreq"]
+
+    def _source_fingerprint(self):
+        return source_fingerprint(self._get_file("eeg.set"), self._get_file("eeg.fdt"))
+
+    def _store_key(self, kind, **params):
+        if self.precision != "float64":
+            params["precision"] = self.precision  # float64 keys stay as they were before the option
+        return self._store.key(self._source_fingerprint(), kind=kind, **params)
+
+    def _load_from_store(self, key):
+        entry = self._store.load(key)
+        if entry is None:
+            return None
+        data, info, _ = entry
+        return raw_from_array(data, info, self._raw)
+
+    def _save_to_store(self, key, raw, **manifest):
+        self._store.save(key, raw._data, raw.info, manifest)
+
+    def _filter_stage(self, l_freq, h_freq):
+        key = self._cache_key("stage", l_freq, h_freq)
+        stage = self._cache.get(key)
+        if stage is None:
+            stage = self._cache.put(key, freeze(filter_raw(self._ensure_loaded(), l_freq, h_freq,
+                                                          block_size=self.block_size)))
+        return stage
+
+    def _filter_input(self):
+        """
+        What float32 filtering reads: the memmapped signal when mmap is on (so the .fdt is not
+        re-read), otherwise the source as opened, so rounding happens only once, on the output.
+        """
+        return self._ensure_loaded() if self._mmap else self._source
+
+    def _filter(self, l_freq, h_freq):
+        if self.dtype != np.float64:
+            # Incremental stages are not used: combining float32 stages with the float32 signal
+            # would add a second rounding error.
+            return filter_raw(self._filter_input(), l_freq, h_freq, block_size=self.block_size, dtype=self.dtype)
+        raw = self._ensure_loaded()
+        if self.filter_mode == "incremental" and is_bandpass(l_freq, h_freq):
+            highpassed = self._filter_stage(l_freq, None)
+            lowpassed = self._filter_stage(None, h_freq)
+            return combine_bandpass(raw, highpassed, lowpassed, h_freq)
+        return filter_raw(raw, l_freq, h_freq, block_size=self.block_size)
 
-        channels_path = self._get_file("channels.tsv")
-        if channels_path.exists():
-            self.channels = pd.read_csv(channels_path, sep='\t')
+    def get_filtered_raw(self, l_freq=1, h_freq=50):
+        with span("get_filtered_raw", l_freq=l_freq, h_freq=h_freq, mode=self.filter_mode) as s, self._lock:
+            filtered = self._get_filtered_raw(l_freq, h_freq, s)
+            s.held(filtered)
+            return filtered
 
-        electrodes_path = self._get_file("electrodes.tsv")
-        if electrodes_path.exists():
-            self.electrodes = pd.read_csv(electrodes_path, sep='\t')
+    def _get_filtered_raw(self, l_freq, h_freq, s):
+        key = self._cache_key("filtered", l_freq, h_freq)
 
-    def get_filtered_raw(self, l_freq=1, h_freq=50):
-        key = (l_freq, h_freq)
-        
         # Return cached version if available
-        if key in self._filtered_cache:
-            return self._filtered_cache[key]
+        cached = self._cache.get(key)
+        if cached is not None:
+            s.hit()
+            return cached
+
+        store_key = None
+        if self._store is not None:
+            store_key = self._store_key("filtered", l_freq=l_freq, h_freq=h_freq, **FILTER_DESIGN)
+            raw_copy = self._load_from_store(store_key)
+            if raw_copy is not None:
+                s.hit("store")
+                return self._cache.put(key, freeze(raw_copy))
+        s.miss()
+
+        manifest = dict(subject=self.subject, task=self.task, run=self.run,
+                        l_freq=l_freq, h_freq=h_freq, precision=self.precision, **FILTER_DESIGN)
+        if self.filter_mode == "chunked":
+            # Reads the source in blocks (even if it was never loaded) and writes into the store.
+            header = self.get_header() if self.dtype == np.float64 else self._filter_input()
+            out = self._store.create(store_key, (len(header.ch_names), header.n_times), dtype=self.dtype)
+            with span("stream_filter", block_size=self.block_size):
+                stream_filter(header, l_freq, h_freq, out, block_size=self.block_size)
+            self._store.commit(store_key, out, filtered_info(header.info, l_freq, h_freq), manifest)
+            del out
+            return self._cache.put(key, freeze(self._load_from_store(store_key)))
 
         # Filter and cache
-        raw_copy = self._raw.copy().load_data()
-        raw_copy.filter(l_freq=l_freq, h_freq=h_freq, fir_design="firwin", skip_by_annotation="edge")
-        
-        self._filtered_cache[key] = raw_copy
-        return raw_copy
-
-    def get_epochs(self, l_freq=1, h_freq=50):
-        key = (l_freq, h_freq)
-        if key in self._epochs_cache:
-            return self._epochs_cache[key]
-
-        if self.task == 'RestingState':
-            epochs, labels = self._resting_preprocess(l_freq, h_freq)
-        elif self.task == 'surroundSupp':
-            epochs, labels = self._Sus_preprocess(l_freq, h_freq)
-        else:
-            return None, None  # Unsupported task
+        if self.dtype == np.float64:
+            self._ensure_loaded()  # its own load_data span, so "filter" is the FIR pass alone
+        with span("filter"):
+            raw_copy = self._filter(l_freq, h_freq)
 
-        if epochs is not None:
-            self._epochs_cache[key] = (epochs, labels)
+        if store_key is not None:
+            with span("store_save"):
+                self._save_to_store(store_key, raw_copy, **manifest)
+        return self._cache.put(key, freeze(raw_copy))
 
-        return epochs, labels
-
-    def _Sus_preprocess(self, tmin=0.0, duration=2.4, l_freq=1, h_freq=50):
+    def get_overview(self, l_freq=1, h_freq=50):
         """
-        Preprocess surroundSupp task using 'stim_ON' events.
-        Epochs are 2.4s long and labeled by background + foreground_contrast + stimulus_cond.
+        Min/max decimation pyramid of the filtered recording (see overview.py), cached alongside it:
+        in the LRU and, with a SignalStore, as one store entry per level.
         """
+        with span("get_overview", l_freq=l_freq, h_freq=h_freq) as s:
+            pyramid = self._get_overview(l_freq, h_freq, s)
+            s.held(pyramid)
+            return pyramid
+
+    def _get_overview(self, l_freq, h_freq, s):
+        key = self._cache_key("overview", l_freq, h_freq)
+        cached = self._cache.get(key)
+        if cached is not None:
+            s.hit()
+            return cached
+
         filtered_raw = self.get_filtered_raw(l_freq=l_freq, h_freq=h_freq)
-        df = self.events
-        stim_rows = df[df['value'] == 'stim_ON'].copy()
-
-        stim_rows['label'] = stim_rows.apply(
-            lambda row: f"bg{int(row['background'])}_fg{row['foreground_contrast']}_stim{int(row['stimulus_cond'])}",
-            axis=1
-        )
-
-        # Create event_id mapping from existing unique labels
-        unique_labels = sorted(stim_rows['label'].unique())
-        event_id = {label: idx + 1 for idx, label in enumerate(unique_labels)}
-        stim_rows['event_code'] = stim_rows['label'].map(event_id)
-
-        # Build events array
-        events_array = np.column_stack([
-            stim_rows['sample'].astype(int),
-            np.zeros(len(stim_rows), dtype=int),
-            stim_rows['event_code'].astype(int)
-        ])
-
-        # Epoching
-        tmax = tmin + duration
-        epochs = Epochs(
-            filtered_raw,
-            events=events_array,
-            event_id=event_id,
-            tmin=tmin,
-            tmax=tmax,
-            baseline=None,
-            proj=True,
-            preload=True,
-            detrend=1
-        )
-        labels = stim_rows['label'].values
-        labels = labels[epochs.selection]
-        return epochs, labels
-
-    def _resting_preprocess(self, tmin=0.0, tmax=20.0, l_freq=1, h_freq=50):
+        store_keys = {}
+        if self._store is not None:
+            store_keys = {factor: self._store_key("overview", l_freq=l_freq, h_freq=h_freq, factor=factor,
+                                                  **FILTER_DESIGN)
+                          for factor in PYRAMID_FACTORS}
+            if all(k in self._store for k in store_keys.values()):
+                levels = {factor: self._store.load(k)[0] for factor, k in store_keys.items()}
+                pyramid = OverviewPyramid(levels, filtered_raw.info, filtered_raw.first_samp,
+                                          filtered_raw.annotations)
+                s.hit("store")
+                return self._cache.put(key, pyramid)
+
+        s.miss()
+        pyramid = OverviewPyramid.from_raw(filtered_raw)
+        for factor, store_key in store_keys.items():
+            self._store.save(store_key, pyramid.levels[factor], filtered_raw.info,
+                             dict(subject=self.subject, task=self.task, run=self.run,
+                                  l_freq=l_freq, h_freq=h_freq, factor=factor))
+        return self._cache.put(key, pyramid)
+
+    def get_epochs(self, l_freq=1, h_freq=50, **params):
         """
-        Crop raw based on 'resting_start' to 'break cnt' in events.tsv,
-        then epoch using eye condition annotations.
+        Epochs and labels for this task via its registered preprocessor (see preprocessors.py);
+        `params` override the preprocessor defaults, e.g. tmin/tmax/duration, and
+        backend="strided" returns zero-copy WindowedEpochs instead of preloaded mne.Epochs.
+        The cache key covers the band and every preprocessor parameter; returned objects are
+        shared and read-only, so .copy() before modifying them.
         """
-        filtered_raw = self.get_filtered_raw(l_freq=l_freq, h_freq=h_freq)
-
-        # Step 1: Find resting_start and break cnt from TSV
-        df = self.events
+        preprocessor = get_preprocessor(self.task, **params)
+        if preprocessor is None:
+            return None, None  # Unsupported task
 
-        t_start = df[df['value'] == 'resting_start']['onset'].values[0]
-        t_end = df[df['value'] == 'break cnt']['onset'].values[1]
+        key = self._cache_key("epochs", l_freq, h_freq, *preprocessor.cache_key())
+        with span("get_epochs", l_freq=l_freq, h_freq=h_freq, backend=preprocessor.params["backend"]) as s:
+            cached = self._cache.get(key)
+            if cached is not None:
+                s.hit()
+                return cached
 
-        # Step 2: Crop raw to this resting window
-        filtered_raw.crop(tmin=t_start, tmax=t_end)
+            s.miss()
+            epochs, labels = preprocessor(self, l_freq, h_freq)
+            if epochs is not None and isinstance(epochs, mne.BaseEpochs) and epochs._data.dtype != self.dtype:
+                # mne.Epochs preloads float64 whatever the raw's dtype; WindowedEpochs views keep it.
+                epochs._data = epochs._data.astype(self.dtype)
+            s.held(epochs)
 
-        # Step 3: Extract new events from cropped raw's annotations
-        events, event_id = events_from_annotations(self._raw)
+            if epochs is not None:
+                self._cache.put(key, freeze((epochs, labels)))
 
-        eye_event_id = {
-            'open': event_id['instructed_toOpenEyes'],
-            'close': event_id['instructed_toCloseEyes']
-        }
+            return epochs, labels
 
-        # Step 4: Create epochs based on eye condition labels
-        epochs = Epochs(
-            filtered_raw,
-            events=events,
-            event_id=eye_event_id,
-            tmin=tmin,
-            tmax=tmax,
-            proj=True,
-            baseline=None,
-            preload=True
-        )
-
-        labels = epochs.events[:, -1] - eye_event_id['open']  # 0=open, 1=close
-        
-        return epochs, labels
+    def compile_events(self, value=None, columns=('value',), formatter=str, pattern=None):
+        """
+        MNE events for the events.tsv rows whose 'value' equals `value` (or fully matches the regex
+        `pattern`), labeled by `columns` via `formatter`. Memoized: the events table never changes.
+        """
+        key = (value, pattern, tuple(columns), formatter)
+        if key not in self._compiled_events:
+            df = self.events
+            if pattern is not None:
+                rows = df[df['value'].astype(str).str.fullmatch(pattern)]
+            else:
+                rows = df[df['value'] == value]
+            self._compiled_events[key] = compile_events(rows, columns, formatter)
+        return self._compiled_events[key]
 
     def show_annotations(self):
         return self.metadata if self.metadata else None
@@ -191,7 +368,7 @@ class EEGTaskData:
                 'timespan_sec': epochs.times[-1] - epochs.times[0],
                 'labels': np.unique(labels) if labels is not None else 'N/A',
                 'sampling_rate': epochs.info['sfreq'],
-                'duration_per_epoch_sec': epochs.get_data().shape[-1] / epochs.info['sfreq']
+                'duration_per_epoch_sec': len(epochs.times) / epochs.info['sfreq']
             }
             return pd.DataFrame([info])
 
@@ -199,5 +376,5 @@ class EEGTaskData:
         return df.head(rows) if df is not None else None
 
     def get_raw(self):
-        return self._raw
+        return self._ensure_loaded()
 
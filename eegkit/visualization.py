@@ -1,15 +1,21 @@
+from contextlib import contextmanager
 from .subject import EEGSubjectData
-import matplotlib.pyplot as plt
+from .windows import as_mne_epochs
+from .spectral import SpectralEngine
+from .overview import overview_factor
+from .profiling import span
 
 class EEGVisualization:
     def __init__(self, subject_data: EEGSubjectData):
         self.data = subject_data
+        self.spectra = SpectralEngine(cache=subject_data.cache)
         self.default_params = {
             "l_freq": {"type": "float", "default": 1.0},
             "h_freq": {"type": "float", "default": 50.0},
         }
 
         self.plot_specs = self._build_plot_specs()
+        self._captured = None  # list of finished figures while capturing, see capture()
 
     def _build_plot_specs(self):
         return {
@@ -71,6 +77,15 @@ class EEGVisualization:
             },
         }
 
+    @contextmanager
+    def capture(self):
+        """Collect finished figures in a list instead of showing them (used by rendering.FigureRenderer)."""
+        self._captured = []
+        try:
+            yield self._captured
+        finally:
+            self._captured = None
+
     def _validate_and_crop(self, epochs, tmin, tmax):
         start = epochs.tmin
         end = epochs.tmax
@@ -85,6 +100,7 @@ class EEGVisualization:
         return cropped
 
     def _finalize_figure(self, fig, subject, task, run=None, stimulus=None, caption: dict = None, plot_name="EEG Plot"):
+        import matplotlib.pyplot as plt  # deferred: only needed once something is drawn
         if not isinstance(fig, plt.Figure):
             return
 
@@ -103,7 +119,11 @@ class EEGVisualization:
             fig.text(0.5, 0.92, caption_line, ha='center', fontsize=11)
 
         fig.subplots_adjust(top=0.90)
-        plt.show()
+        if self._captured is not None:
+            self._captured.append(fig)
+        else:
+            with span("plt_show"):
+                plt.show()
 
     def _filter_params(self, plot_type, kwargs):
         spec = self.plot_specs.get(plot_type, {})
@@ -116,25 +136,37 @@ class EEGVisualization:
 
     def _get_epochs(self, subject, task, run, l_freq, h_freq):
         task_data = self.data.get_task(subject, task, run)
-        return task_data.get_epochs(l_freq, h_freq)
+        epochs, labels = task_data.get_epochs(l_freq, h_freq)
+        return as_mne_epochs(epochs), labels
 
     def plot_sensors(self, subject, task, run=None, **kwargs):
         params = self._filter_params("sensors", kwargs)
         raw = self._get_raw(subject, task, run, params["l_freq"], params["h_freq"])
-        raw.plot_sensors(show_names=True)
+        with span("draw", plot="sensors"):
+            fig = raw.plot_sensors(show_names=True, show=False)
+        self._finalize_figure(fig, subject, task, run, plot_name="Sensor Layout")
 
     def plot_time(self, subject, task, run=None, **kwargs):
         params = self._filter_params("time", kwargs)
         raw = self._get_raw(subject, task, run, params["l_freq"], params["h_freq"])
-        
-        fig = raw.plot(
-            duration=params["duration"],
-            start=params["start"],
-            n_channels=params["n_channels"],
-            scalings='auto',
-            show=False,
-            block=True
-        )
+
+        # Long windows are drawn from the min/max pyramid level with ~one envelope pair per pixel;
+        # zoomed-in windows fall back to the full-resolution filtered raw without building the pyramid.
+        factor = overview_factor(raw.info["sfreq"], params["duration"])
+        if factor is not None:
+            overview = self.data.get_task(subject, task, run).get_overview(params["l_freq"], params["h_freq"])
+            raw = overview.as_raw(factor)
+
+        with span("draw", plot="time", decimation=factor):
+            fig = raw.plot(
+                duration=params["duration"],
+                start=params["start"],
+                n_channels=params["n_channels"],
+                scalings='auto',
+                decim=1 if factor is not None else 'auto',
+                show=False,
+                block=True
+            )
 
         self._finalize_figure(
             fig, subject, task, run,
@@ -146,13 +178,17 @@ class EEGVisualization:
         params = self._filter_params("frequency", kwargs)
         raw = self._get_raw(subject, task, run, params["l_freq"], params["h_freq"])
 
-        psd = raw.compute_psd(fmin=params["fmin"], fmax=params["fmax"])
-        fig = psd.plot(
-            average=params["average"],
-            spatial_colors=params["spatial_colors"],
-            dB=params["dB"],
-            show=False
-        )
+        # Cached per (recording, filter, fmin, fmax, window): display toggles only re-render.
+        recording_key = (subject, task, run, params["l_freq"], params["h_freq"])
+        with span("compute_psd", kind="raw"):
+            psd = self.spectra.raw_spectrum(recording_key, raw, params["fmin"], params["fmax"])
+        with span("draw", plot="frequency"):
+            fig = psd.plot(
+                average=params["average"],
+                spatial_colors=params["spatial_colors"],
+                dB=params["dB"],
+                show=False
+            )
 
         self._finalize_figure(
             fig, subject, task, run,
@@ -162,26 +198,31 @@ class EEGVisualization:
 
 
     def plot_conditionwise_psd(self, subject, task, run=None, **kwargs):
-        params = self._filter_params("conditionwise_psd", kwargs)
+        params = self._filter_params("conditionwise psd", kwargs)
         epochs, labels = self._get_epochs(subject, task, run, params["l_freq"], params["h_freq"])
 
         if epochs is None:
             print(f"No epochs available for {subject} - {task}" + (f" (Run {run})" if run else ""))
             return
 
+        tmin = max(epochs.tmin, params["tmin"]) if params["tmin"] is not None else epochs.tmin
+        tmax = min(epochs.tmax, params["tmax"]) if params["tmax"] is not None else epochs.tmax
+        if tmin >= tmax:
+            print(f"Invalid crop range: tmin={params['tmin']}, tmax={params['tmax']}")
+            return
+
+        # One batched Welch pass over all conditions, cached; display toggles only re-render.
+        recording_key = (subject, task, run, params["l_freq"], params["h_freq"])
+        with span("compute_psd", kind="conditions"):
+            spectra = self.spectra.condition_spectra(recording_key, epochs, params["fmin"], params["fmax"], tmin, tmax)
+
         for condition in epochs.event_id:
-            condition_epochs = epochs[condition]
-            if len(condition_epochs) == 0:
+            if condition not in spectra:
                 print(f"Skipping condition '{condition}' — no valid epochs.")
                 continue
 
-            cropped = self._validate_and_crop(condition_epochs, params["tmin"], params["tmax"])
-            if cropped is None:
-                print(f"Skipping {condition} — Invalid crop range: tmin={params['tmin']}, tmax={params['tmax']}")
-                continue
-
-            psd = cropped.compute_psd(fmin=params["fmin"], fmax=params["fmax"])
-            fig = psd.plot(average=params["average"], spatial_colors=True, dB=params["dB"], show=False)
+            with span("draw", plot="conditionwise psd", condition=condition):
+                fig = spectra[condition].plot(average=params["average"], spatial_colors=True, dB=params["dB"], show=False)
 
             self._finalize_figure(
                 fig, subject, task, run, condition,
@@ -212,13 +253,47 @@ class EEGVisualization:
             print(f"Invalid crop window: tmin={params['tmin']}, tmax={params['tmax']}")
             return
 
-        if mode == 'evoked':
-            fig = cropped.average().plot(show=False)
-        else:
-            fig = cropped.plot(events=False, n_channels=params["n_channels"], show=False)
+        with span("draw", plot=mode):
+            if mode == 'evoked':
+                fig = cropped.average().plot(show=False)
+            else:
+                fig = cropped.plot(events=False, n_channels=params["n_channels"], show=False)
 
         self._finalize_figure(
             fig, subject, task, run, params["stimulus"],
             caption=params,
             plot_name=mode
-        )
\ No newline at end of file
+        )
+
+    def plot_grand_average(self, keys, mode="evoked", conditions=None, level="recordings", l_freq=1.0, h_freq=50.0,
+                           tmin=None, tmax=None, fmin=1.0, fmax=50.0, dB=True):
+        """
+        Cohort-level evoked response or PSD per condition over (subject, task, run) keys, accumulated
+        one recording at a time (see grand_average.GrandAverage). Returns the accumulator.
+        """
+        from .grand_average import GrandAverage
+        grand = GrandAverage(self.data, kind=mode, l_freq=l_freq, h_freq=h_freq, tmin=tmin, tmax=tmax,
+                             fmin=fmin, fmax=fmax).run(keys)
+        if not grand.added:
+            print("No recordings with epochs to average.")
+            return grand
+
+        tasks = " / ".join(sorted({task for _, task, _ in grand.added}))
+        label = f"Grand average of {len(grand.added)} recordings"
+        caption = {"l_freq": l_freq, "h_freq": h_freq, "level": level}
+        for condition in conditions or grand.conditions:
+            if condition not in grand.stats:
+                print(f"Skipping condition '{condition}' — no valid epochs.")
+                continue
+            with span("draw", plot=f"grand average {mode}", condition=condition):
+                if mode == "evoked":
+                    fig = grand.evoked(condition, level).plot(show=False)
+                else:
+                    fig = grand.spectrum(condition, level).plot(average=True, spatial_colors=False, dB=dB, show=False)
+            n = grand.stats[condition][level].count
+            self._finalize_figure(
+                fig, label, tasks, stimulus=condition,
+                caption={**caption, f"n_{level}": n},
+                plot_name=f"Grand Average {'Evoked' if mode == 'evoked' else 'PSD'}"
+            )
+        return grand
@@ -0,0 +1,126 @@
+import mne
+from mne.annotations import _annotations_starts_stops
+import numpy as np
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+from .cache import nbytes_of
+
+
+class WindowedEpochs:
+    """
+    Fixed-length epochs as read-only views over a (filtered, preloaded) raw array.
+    Windows are slices of sliding_window_view(data, n_times) at the event samples, so nothing is
+    copied until data is requested; detrend/baseline are applied on access. Mirrors the parts of
+    mne.Epochs the toolkit uses (events, event_id, selection, times, info, ch_names, __len__,
+    get_data); to_epochs() converts to an mne.EpochsArray when an MNE plotting function needs one.
+    """
+
+    def __init__(self, raw, events, event_id, tmin, tmax, baseline=None, detrend=None,
+                 reject_by_annotation=True):
+        self.info = raw.info
+        self.event_id = dict(event_id)
+        self.baseline = baseline
+        self.detrend = detrend
+
+        sfreq = raw.info["sfreq"]
+        smin, smax = int(round(tmin * sfreq)), int(round(tmax * sfreq))
+        self.times = np.arange(smin, smax + 1) / sfreq
+        self.tmin, self.tmax = self.times[0], self.times[-1]
+        n_times = smax - smin + 1
+
+        data = raw._data
+        starts = events[:, 0] - raw.first_samp + smin
+        keep = np.isin(events[:, 2], list(self.event_id.values()))
+        keep &= (starts >= 0) & (starts + n_times <= data.shape[1])
+        if reject_by_annotation:
+            # Same rule as mne.Epochs: drop windows overlapping any 'bad*' annotation.
+            for bad_start, bad_stop in zip(*_annotations_starts_stops(raw, "bad")):
+                keep &= (starts + n_times <= bad_start) | (starts >= bad_stop)
+
+        self.selection = np.flatnonzero(keep)
+        self.events = events[keep]
+        self._starts = starts[keep]
+
+        self._source = data
+        self._n_times = n_times
+        self._windows = sliding_window_view(data, n_times, axis=1)  # (n_channels, n_positions, n_times) view
+        self._epochs = None
+
+    def __len__(self):
+        return len(self._starts)
+
+    @property
+    def ch_names(self):
+        return self.info["ch_names"]
+
+    @property
+    def nbytes(self):
+        # The views keep the whole filtered array alive, even after its own cache entry is evicted,
+        # so it is counted here (0 when file-backed), plus a materialized EpochsArray if any.
+        materialized = self._epochs._data.nbytes if self._epochs is not None else 0
+        return nbytes_of(self._source) + materialized
+
+    def window(self, index):
+        """Zero-copy (n_channels, n_times) view of one epoch, before detrend/baseline."""
+        return self._windows[:, self._starts[index], :]
+
+    def _process(self, data):
+        if self.detrend is not None:
+            from scipy.signal import detrend as scipy_detrend  # deferred: scipy.signal takes ~1 s to import
+            data = scipy_detrend(data, axis=-1, type="constant" if self.detrend == 0 else "linear")
+        if self.baseline is not None:
+            bmin, bmax = self.baseline
+            mask = np.ones(len(self.times), bool)
+            if bmin is not None:
+                mask &= self.times >= bmin
+            if bmax is not None:
+                mask &= self.times <= bmax
+            data = data - data[..., mask].mean(axis=-1, keepdims=True)
+        return data
+
+    def __getitem__(self, index):
+        return self._process(self.window(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def view(self):
+        """
+        (n_epochs, n_channels, n_times) read-only strided view when the epochs are evenly spaced
+        (fixed-length windows), else None.
+        """
+        if len(self) == 0:
+            return None
+        steps = np.diff(self._starts)
+        if len(steps) and not (steps == steps[0]).all():
+            return None
+        step = int(steps[0]) if len(steps) else 0
+        base = self._source[:, self._starts[0]:]
+        return as_strided(
+            base,
+            shape=(len(self), base.shape[0], self._n_times),
+            strides=(step * base.strides[1], base.strides[0], base.strides[1]),
+            writeable=False,
+        )
+
+    def get_data(self):
+        """
+        (n_epochs, n_channels, n_times). Evenly spaced windows without detrend/baseline come back as
+        the zero-copy view; otherwise the windows are gathered (one copy) and processed.
+        """
+        view = self.view()
+        if view is None:
+            view = np.moveaxis(self._windows[:, self._starts, :], 1, 0)
+        return self._process(view)
+
+    def to_epochs(self):
+        if self._epochs is None:
+            self._epochs = mne.EpochsArray(
+                np.ascontiguousarray(self.get_data()), self.info, events=self.events, tmin=self.tmin,
+                event_id=self.event_id, baseline=None, verbose=False
+            )
+        return self._epochs
+
+
+def as_mne_epochs(epochs):
+    return epochs.to_epochs() if isinstance(epochs, WindowedEpochs) else epochs
@@ -0,0 +1,51 @@
+import mne
+import numpy as np
+import pytest
+from eegkit.cache import LRUCache, freeze
+
+
+def block(n_bytes):
+    return np.zeros(n_bytes, dtype=np.uint8)
+
+
+def test_evicts_least_recently_used_first():
+    cache = LRUCache(max_bytes=300)
+    for key in "abc":
+        cache.put(key, block(100))
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", block(100))
+
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert len(cache) == 3 and cache.nbytes == 300 and cache.evictions == 1
+
+
+def test_never_evicts_the_most_recently_used_entry():
+    cache = LRUCache(max_bytes=100)
+    cache.put("a", block(50))
+    cache.put("big", block(500))
+
+    assert "a" not in cache and "big" in cache
+    assert len(cache) == 1 and cache.evictions == 1
+
+
+def test_unbounded_cache_keeps_everything():
+    cache = LRUCache()
+    for i in range(10):
+        cache.put(i, block(1000))
+    assert len(cache) == 10 and cache.evictions == 0
+
+
+def test_freeze_rejects_writes():
+    info = mne.create_info(["E1", "E2"], 100.0, "eeg")
+    raw = mne.io.RawArray(np.zeros((2, 100)), info, verbose=False)
+    array = np.zeros(10)
+    freeze((raw, [array]))
+
+    with pytest.raises(ValueError, match="read-only"):
+        raw._data[0, 0] = 1.0
+    with pytest.raises(ValueError, match="read-only"):
+        array += 1
+    with pytest.raises(ValueError, match="read-only"):
+        raw.apply_function(np.negative)
+    raw.copy()._data[0, 0] = 1.0  # copies are writable again
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from eegkit.events import compile_events
+
+
+def test_compile_events_factorizes_label_combinations():
+    rows = pd.DataFrame({
+        "sample": [10, 20, 30, 40, 50],
+        "side": ["right", "left", "right", "left", "left"],
+        "level": [2, 1, 2, 2, 1],
+    })
+    calls = []
+
+    def formatter(side, level):
+        calls.append((side, level))
+        return f"{side}{level}"
+
+    compiled = compile_events(rows, ["side", "level"], formatter)
+
+    assert sorted(calls) == [("left", 1), ("left", 2), ("right", 2)]  # once per distinct combination
+    assert compiled.event_id == {"left1": 1, "left2": 2, "right2": 3}  # sorted labels → 1..n
+    assert list(compiled.labels) == ["right2", "left1", "right2", "left2", "left1"]
+    np.testing.assert_array_equal(compiled.events, [[10, 0, 3], [20, 0, 1], [30, 0, 3], [40, 0, 2], [50, 0, 1]])
+    assert len(compiled) == 5
+
+
+def test_formatters_mapping_combinations_to_one_label_share_a_code():
+    rows = pd.DataFrame({"sample": [1, 2, 3], "value": ["a_ON", "b_ON", "a_OFF"]})
+    compiled = compile_events(rows, ["value"], lambda value: value.split("_")[0])
+
+    assert compiled.event_id == {"a": 1, "b": 2}
+    np.testing.assert_array_equal(compiled.events[:, 2], [1, 2, 1])
@@ -0,0 +1,50 @@
+import mne
+import numpy as np
+from eegkit.filtering import (
+    BANDPASS_TOLERANCE, FLOAT32_TOLERANCE, filter_raw, max_precision_deviation, max_relative_deviation, stream_filter
+)
+
+
+def _raw(offset=0.0, n_channels=8, n_times=30000, sfreq=500.0):
+    info = mne.create_info([f"E{i}" for i in range(1, n_channels + 1)], sfreq, "eeg")
+    data = np.random.default_rng(0).standard_normal((n_channels, n_times)) * 10e-6 + offset
+    return mne.io.RawArray(data, info, verbose=False)
+
+
+def test_float32_filter_within_tolerance_despite_dc_offset():
+    # DC-coupled amplifiers record tens of mV of offset under µV-scale EEG.
+    raw = _raw(offset=20e-3)
+    assert max_precision_deviation(raw, 1.0, 40.0) < FLOAT32_TOLERANCE
+
+
+def test_float32_filter_keeps_dtype():
+    filtered = filter_raw(_raw(), 1.0, 40.0, dtype=np.float32)
+    assert filtered._data.dtype == np.float32
+    assert filtered.info["highpass"] == 1.0 and filtered.info["lowpass"] == 40.0
+
+
+def _edge_raw(first_samp=1234, sfreq=250.0, block_size=300):
+    raw = _raw(offset=5e-6, n_times=12000, sfreq=sfreq)
+    raw = mne.io.RawArray(raw._data, raw.info, first_samp=first_samp, verbose=False)
+    # Segment boundaries (skip_by_annotation="edge") just before and after block edges.
+    onsets = np.array([3 * block_size - 2, 7 * block_size + 1, 11000]) / sfreq
+    raw.set_annotations(mne.Annotations(onsets, [0.0, 0.0, 0.0], ["edge boundary"] * 3))
+    return raw
+
+
+def test_incremental_bandpass_matches_direct():
+    raw = _edge_raw()
+    assert max_relative_deviation(raw, 1.0, 40.0) < BANDPASS_TOLERANCE
+
+
+def test_stream_filter_matches_direct_with_small_blocks():
+    raw = _edge_raw()
+    n_taps = len(mne.filter.create_filter(None, raw.info["sfreq"], 1.0, 40.0, fir_design="firwin", verbose=False))
+    assert n_taps > 300  # blocks shorter than the kernel
+
+    for l_freq, h_freq in [(1.0, 40.0), (1.0, None), (None, 40.0)]:
+        direct = filter_raw(raw, l_freq, h_freq)
+        out = np.empty_like(raw._data)
+        stream_filter(raw, l_freq, h_freq, out, block_size=300)
+        deviation = np.abs(out - direct._data).max() / np.abs(direct._data).max()
+        assert deviation < BANDPASS_TOLERANCE, (l_freq, h_freq, deviation)
@@ -0,0 +1,25 @@
+import numpy as np
+from eegkit.grand_average import RunningStats
+
+
+def test_running_stats_match_numpy_over_batches_and_single_values():
+    values = np.random.default_rng(0).standard_normal((23, 4, 5)) * 1e-5 + 3e-5
+    stats = RunningStats()
+    stats.update(values[:10])
+    stats.update(values[10:10])  # empty batches are ignored
+    for value in values[10:13]:
+        stats.add(value)
+    stats.update(values[13:])
+
+    assert stats.count == 23
+    np.testing.assert_allclose(stats.mean, values.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(stats.variance, values.var(axis=0, ddof=1), rtol=1e-10)
+    np.testing.assert_allclose(stats.sem, values.std(axis=0, ddof=1) / np.sqrt(23), rtol=1e-10)
+
+
+def test_variance_is_nan_until_two_values():
+    stats = RunningStats()
+    stats.add(np.ones(3))
+    assert np.isnan(stats.variance).all()
+    stats.add(np.zeros(3))
+    np.testing.assert_allclose(stats.variance, 0.5)
@@ -0,0 +1,17 @@
+import subprocess
+import sys
+import pytest
+from eegkit.benchmark import HEADLESS_IMPORTS, measure_import
+
+
+def test_import_eegkit_loads_no_heavy_packages():
+    code = "import sys, eegkit; print(' '.join(m for m in ('mne', 'matplotlib', 'pandas', 'scipy') if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.strip()
+    assert loaded == ""
+
+
+@pytest.mark.parametrize("statement", list(HEADLESS_IMPORTS))
+def test_headless_imports_skip_forbidden_packages(statement):
+    # Which modules load, not how long it takes: timing is left to `eegkit imports` / run_benchmark.
+    _, packages = measure_import(statement)
+    assert not set(HEADLESS_IMPORTS[statement]) & packages
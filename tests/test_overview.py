@@ -0,0 +1,27 @@
+import numpy as np
+from eegkit.overview import build_levels, overview_factor
+
+
+def direct_envelope(data, factor):
+    n_bins = -(-data.shape[1] // factor)
+    padded = np.pad(data, ((0, 0), (0, n_bins * factor - data.shape[1])), mode="edge")
+    bins = padded.reshape(data.shape[0], n_bins, factor)
+    return bins.min(axis=-1), bins.max(axis=-1)
+
+
+def test_levels_are_min_max_envelopes_of_the_full_rate_data():
+    data = np.random.default_rng(0).standard_normal((3, 1001))  # not a multiple of any factor
+    levels = build_levels(data, factors=(4, 16, 64))
+
+    assert sorted(levels) == [4, 16, 64]
+    for factor, level in levels.items():
+        mins, maxs = direct_envelope(data, factor)
+        np.testing.assert_array_equal(level[:, 0::2], mins)
+        np.testing.assert_array_equal(level[:, 1::2], maxs)
+        assert level.dtype == data.dtype
+
+
+def test_overview_factor_keeps_one_pair_per_pixel():
+    assert overview_factor(500.0, 10.0, width=2000) is None  # 5000 samples: full resolution
+    assert overview_factor(500.0, 600.0, width=2000) == 128  # 300000 / 128 >= 2000 > 300000 / 512
+    assert overview_factor(500.0, 3600.0, width=2000) == 512
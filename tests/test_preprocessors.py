@@ -0,0 +1,106 @@
+import mne
+import numpy as np
+import pandas as pd
+import pytest
+from eegkit.preprocessors import get_preprocessor
+from eegkit.task import EEGTaskData
+
+
+def test_cache_key_fingerprints_every_parameter():
+    default = get_preprocessor("contrastChangeDetection")
+    assert default.cache_key() == get_preprocessor("contrastChangeDetection").cache_key()
+    assert default.cache_key() != get_preprocessor("contrastChangeDetection", tmax=1.5).cache_key()
+    assert default.cache_key() != get_preprocessor("contrastChangeDetection", backend="strided").cache_key()
+    assert default.cache_key() != get_preprocessor("seqLearning6target").cache_key()
+
+    nested = get_preprocessor("surroundSupp", baseline=[None, 0.0])
+    assert hash(nested.cache_key()) == hash(get_preprocessor("surroundSupp", baseline=(None, 0.0)).cache_key())
+    assert nested.cache_key() != get_preprocessor("surroundSupp", baseline=[None, 0.1]).cache_key()
+
+
+class Recording:
+    """Stand-in for EEGTaskData: an events table and a header Raw, with the real event compiler."""
+    compile_events = EEGTaskData.compile_events
+
+    def __init__(self, task, values, samples, sfreq=100.0, n_times=20000, annotations=None):
+        self.task = task
+        self.events = pd.DataFrame({"onset": np.asarray(samples) / sfreq, "sample": samples, "value": values})
+        info = mne.create_info(["E1", "E2"], sfreq, "eeg")
+        self._raw = mne.io.RawArray(np.zeros((2, n_times)), info, verbose=False)
+        if annotations is not None:
+            self._raw.set_annotations(annotations)
+        self._compiled_events = {}
+
+    def get_header(self):
+        return self._raw
+
+    def get_filtered_raw(self, l_freq, h_freq):
+        return self._raw
+
+
+def test_contrast_change_selects_left_and_right_targets():
+    recording = Recording("contrastChangeDetection",
+                          ["left_target", "right_buttonPress", "right_target", "left_target_extra", "left_target"],
+                          [100, 200, 300, 400, 500])
+    compiled = get_preprocessor("contrastChangeDetection").select_events(recording)
+
+    assert compiled.event_id == {"left_target": 1, "right_target": 2}
+    np.testing.assert_array_equal(compiled.events[:, [0, 2]], [[100, 1], [300, 2], [500, 1]])
+
+
+@pytest.mark.parametrize("task", ["seqLearning6target", "seqLearning8target"])
+def test_seq_learning_selects_dot_onsets(task):
+    recording = Recording(task, ["dot_no1_ON", "dot_no1_OFF", "dot_no12_ON", "dot_noX_ON", "learningBlock_1"],
+                          [100, 150, 200, 250, 300])
+    compiled = get_preprocessor(task).select_events(recording)
+
+    assert list(compiled.labels) == ["dot_no1_ON", "dot_no12_ON"]
+    np.testing.assert_array_equal(compiled.events[:, 0], [100, 200])
+
+
+def test_surround_supp_labels_stimulus_onsets():
+    recording = Recording("surroundSupp", ["stim_ON", "stim_OFF", "stim_ON"], [100, 340, 500])
+    recording.events = recording.events.assign(background=[1.0, None, 0.0], foreground_contrast=[0.8, None, 0.0],
+                                               stimulus_cond=[2.0, None, 3.0])
+    compiled = get_preprocessor("surroundSupp").select_events(recording)
+
+    assert list(compiled.labels) == ["bg1_fg0.8_stim2", "bg0_fg0.0_stim3"]
+    np.testing.assert_array_equal(compiled.events[:, 0], [100, 500])
+
+
+@pytest.mark.parametrize("task", ["DespicableMe", "DiaryOfAWimpyKid", "FunwithFractals", "ThePresent"])
+def test_movies_tile_video_start_to_video_stop(task):
+    recording = Recording(task, ["video_start", "video_stop", "video_stop"], [1000, 1750, 5000])
+    preprocessor = get_preprocessor(task)
+    compiled = preprocessor.select_events(recording)
+
+    np.testing.assert_array_equal(compiled.events[:, 0], [1000, 1200, 1400])  # 2 s windows at 100 Hz
+    assert set(compiled.labels) == {task}
+    assert preprocessor.window(100.0) == (0.0, 1.99)
+    assert preprocessor.window(500.0) == (0.0, 1.998)  # sfreq is per recording, not remembered
+
+
+def test_movie_without_video_start_has_no_events():
+    recording = Recording("ThePresent", ["video_stop"], [1000])
+    assert get_preprocessor("ThePresent").select_events(recording) is None
+
+
+def test_segment_overlap_and_whole_recording():
+    recording = Recording("symbolSearch", ["trialResponse"], [10], n_times=1000)
+    compiled = get_preprocessor("symbolSearch", duration=4.0, overlap=1.0).select_events(recording)
+    np.testing.assert_array_equal(compiled.events[:, 0], [0, 300, 600])
+
+
+def test_resting_state_labels_eye_conditions_inside_the_resting_span():
+    annotations = mne.Annotations([5.0, 30.0, 60.0, 90.0, 170.0], 0.0,
+                                  ["instructed_toOpenEyes", "instructed_toCloseEyes", "instructed_toOpenEyes",
+                                   "instructed_toCloseEyes", "instructed_toOpenEyes"])
+    recording = Recording("RestingState", ["break cnt", "resting_start", "break cnt"], [0, 2000, 15000],
+                          annotations=annotations)
+    epochs, labels = get_preprocessor("RestingState")(recording, 1, 50)
+
+    # 5 s is before resting_start; 170 s + 20 s runs past the second break cnt at 150 s
+    np.testing.assert_array_equal(epochs.events[:, 0], [3000, 6000, 9000])
+    conditions = {code: name for name, code in epochs.event_id.items()}
+    assert [conditions[code] for code in epochs.events[:, 2]] == ["close", "open", "close"]
+    assert labels[1] == 0 and labels[0] == labels[2] != 0
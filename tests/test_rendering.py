@@ -0,0 +1,31 @@
+import matplotlib.pyplot as plt
+import pytest
+from eegkit.benchmark import generate_dataset
+from eegkit.rendering import FigureRenderer
+from eegkit.subject import EEGSubjectData
+from eegkit.visualization import EEGVisualization
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    return generate_dataset(tmp_path_factory.mktemp("bids"), n_subjects=1, duration=30.0, tasks=("RestingState",))
+
+
+def test_render_uses_agg_and_closes_its_figures(data_dir, tmp_path):
+    visualizer = EEGVisualization(EEGSubjectData(data_dir))
+    spec = visualizer.plot_specs["sensors"]
+    backends = []
+    plot = spec["function"]
+    spec["function"] = lambda *args, **kwargs: (backends.append(plt.get_backend().lower()), plot(*args, **kwargs))
+    renderer = FigureRenderer(visualizer, cache_dir=tmp_path)
+    previous = plt.get_backend()
+    plt.switch_backend("pdf")  # stands in for a notebook's backend
+    try:
+        images = renderer.render("sub-NDARBENCH0000", "RestingState", None, "sensors")
+        assert plt.get_backend() == "pdf"
+    finally:
+        plt.switch_backend(previous)
+
+    assert backends == ["agg"]
+    assert images and all(image.startswith(b"\x89PNG") for image in images)
+    assert plt.get_fignums() == []
@@ -0,0 +1,28 @@
+import mne
+import numpy as np
+from eegkit.spectral import SpectralEngine
+
+
+def test_raw_spectrum_matches_mne_with_bads():
+    info = mne.create_info([f"E{i}" for i in range(1, 7)], 250.0, "eeg")
+    raw = mne.io.RawArray(np.random.default_rng(1).standard_normal((6, 25000)) * 1e-5, info, verbose=False)
+    raw.info["bads"] = ["E3"]
+    raw._data[:, 5000:6000] *= 1000  # artifact under the first BAD annotation
+    raw.set_annotations(mne.Annotations([19.5, 70.1], [5.0, 3.3], ["BAD_artifact", "BAD_other"]))
+
+    reference = raw.compute_psd(method="welch", fmin=1, fmax=60, n_fft=256, n_overlap=0, verbose=False)
+    spectrum = SpectralEngine().raw_spectrum(("sub-01", "task", None, 1, 60), raw, 1, 60)
+
+    assert spectrum.ch_names == [ch for ch in raw.ch_names if ch not in raw.info["bads"]]
+    np.testing.assert_allclose(spectrum.get_data(), reference.get_data(), rtol=1e-10)
+
+
+def test_condition_spectra_count_towards_the_cache_budget():
+    info = mne.create_info([f"E{i}" for i in range(1, 5)], 250.0, "eeg")
+    raw = mne.io.RawArray(np.random.default_rng(2).standard_normal((4, 20000)) * 1e-5, info, verbose=False)
+    events = np.array([[s, 0, 1 + i % 2] for i, s in enumerate(range(500, 19000, 700))])
+    epochs = mne.Epochs(raw, events, {"a": 1, "b": 2}, 0, 2.0, baseline=None, preload=True, verbose=False)
+
+    engine = SpectralEngine()
+    spectra = engine.condition_spectra(("sub-01", "task", None, 1, 60), epochs, 1, 60)
+    assert engine._cache.nbytes == sum(s.get_data().nbytes for s in spectra.values()) > 0
@@ -0,0 +1,26 @@
+import mne
+import numpy as np
+from eegkit.store import SignalStore
+
+
+def _raw(n_channels=4, n_times=1000, sfreq=250.0):
+    info = mne.create_info([f"E{i}" for i in range(1, n_channels + 1)], sfreq, "eeg")
+    data = np.random.default_rng(0).standard_normal((n_channels, n_times)) * 1e-5
+    return mne.io.RawArray(data, info, verbose=False)
+
+
+def test_create_commit_load_with_mne_shape(tmp_path):
+    raw = _raw()
+    store = SignalStore(tmp_path)
+    key = store.key("source", kind="filtered")
+
+    out = store.create(key, (len(raw.ch_names), raw.n_times))  # n_times is an np.int64
+    out[:] = raw.get_data()
+    store.commit(key, out, raw.info, {"subject": "sub-01"})
+    del out
+
+    data, info, manifest = store.load(key)
+    assert data.shape == (4, 1000)
+    np.testing.assert_array_equal(data, raw.get_data())
+    assert info["ch_names"] == raw.ch_names
+    assert manifest["shape"] == [4, 1000]
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+import hashlib
+import io
+import json
+from eegkit.sync import S3Sync
+
+PREFIX = "data/cmi_bids_R1"
+PART_SIZE = 4
+
+
+class FakeS3:
+    """The list_objects_v2 paginator and ranged get_object of a boto3 S3 client, over an in-memory bucket."""
+
+    def __init__(self, objects, etags=None):
+        self.objects = objects  # key → bytes
+        self.etags = etags or {}  # key → served ETag (default: MD5 of the content)
+        self.fail = set()  # (key, start) ranges that raise once
+        self.requests = []
+
+    def etag(self, key):
+        return self.etags.get(key, hashlib.md5(self.objects[key]).hexdigest())
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        yield {"Contents": [{"Key": key, "Size": len(body), "ETag": f'"{self.etag(key)}"',
+                             "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+                            for key, body in self.objects.items() if key.startswith(Prefix)]}
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        assert IfMatch == f'"{self.etag(Key)}"'
+        start, end = (int(n) for n in Range.removeprefix("bytes=").split("-"))
+        self.requests.append((Key, start))
+        if (Key, start) in self.fail:
+            self.fail.discard((Key, start))
+            raise IOError("connection reset")
+        return {"Body": io.BytesIO(self.objects[Key][start:end + 1])}
+
+
+def _sync(client, tmp_path):
+    return S3Sync(PREFIX, tmp_path, client=client, workers=2, part_size=PART_SIZE)
+
+
+def _statuses(manifest):
+    return {f["path"]: f["status"] for f in manifest["files"]}
+
+
+def _bucket():
+    return {f"{PREFIX}/sub-01/eeg/a.set": b"0123456789", f"{PREFIX}/participants.tsv": b"id\tage\n"}
+
+
+def test_fresh_download(tmp_path):
+    client = FakeS3(_bucket())
+    manifest = _sync(client, tmp_path).run(log=lambda *a: None)
+
+    assert set(_statuses(manifest).values()) == {"downloaded"}
+    assert (tmp_path / "sub-01/eeg/a.set").read_bytes() == b"0123456789"
+    assert (tmp_path / "participants.tsv").read_bytes() == b"id\tage\n"
+    assert not list(tmp_path.rglob("*.part*"))
+    assert (tmp_path / "sync-manifest.json").exists()
+
+
+def test_resume_after_failed_part(tmp_path):
+    client = FakeS3(_bucket())
+    key = f"{PREFIX}/sub-01/eeg/a.set"
+    client.fail.add((key, 4))
+    manifest = _sync(client, tmp_path).run(log=lambda *a: None)
+
+    assert _statuses(manifest)["sub-01/eeg/a.set"] == "error"
+    part = tmp_path / "sub-01/eeg/a.set.part"
+    progress = json.loads((tmp_path / "sub-01/eeg/a.set.part.json").read_text())
+    assert part.exists() and sorted(progress["done"]) == [0, 2]
+    assert "participants.tsv" in json.loads((tmp_path / ".eegkit-sync.json").read_text())
+
+    client.requests.clear()
+    manifest = _sync(client, tmp_path).run(log=lambda *a: None)
+    assert client.requests == [(key, 4)]  # only the missing range
+    assert _statuses(manifest)["sub-01/eeg/a.set"] == "downloaded"
+    assert (tmp_path / "sub-01/eeg/a.set").read_bytes() == b"0123456789"
+
+
+def test_etag_mismatch_removes_part_file(tmp_path):
+    key = f"{PREFIX}/sub-01/eeg/a.set"
+    client = FakeS3({key: b"0123456789"}, etags={key: hashlib.md5(b"other").hexdigest()})
+    manifest = _sync(client, tmp_path).run(log=lambda *a: None)
+
+    assert _statuses(manifest)["sub-01/eeg/a.set"] == "error"
+    assert not (tmp_path / "sub-01/eeg/a.set").exists()
+    assert not list(tmp_path.rglob("*.part*"))
+
+
+def test_current_files_are_skipped(tmp_path):
+    client = FakeS3(_bucket())
+    _sync(client, tmp_path).run(log=lambda *a: None)
+    client.requests.clear()
+
+    manifest = _sync(client, tmp_path).run(log=lambda *a: None)
+    assert client.requests == []
+    assert set(_statuses(manifest).values()) == {"current"}
+
+
+def test_legacy_file_is_adopted(tmp_path):
+    client = FakeS3(_bucket())
+    (tmp_path / "sub-01/eeg").mkdir(parents=True)
+    (tmp_path / "sub-01/eeg/a.set").write_bytes(b"0123456789")  # e.g. fetched by legacy/boto.py
+
+    manifest = _sync(client, tmp_path).run(log=lambda *a: None)
+    assert _statuses(manifest)["sub-01/eeg/a.set"] == "current"
+    assert all(key != f"{PREFIX}/sub-01/eeg/a.set" for key, _ in client.requests)
+    state = json.loads((tmp_path / ".eegkit-sync.json").read_text())
+    assert state["sub-01/eeg/a.set"]["etag"] == hashlib.md5(b"0123456789").hexdigest()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from eegkit.benchmark import generate_dataset
+from eegkit.filtering import BANDPASS_TOLERANCE, FLOAT32_TOLERANCE
+from eegkit.subject import EEGSubjectData
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    return generate_dataset(tmp_path_factory.mktemp("bids"), n_subjects=1, duration=30.0, tasks=("RestingState",))
+
+
+@pytest.mark.parametrize("filter_mode", ["incremental", "chunked"])
+def test_filter_modes_match_direct(data_dir, tmp_path, filter_mode):
+    key = ("sub-NDARBENCH0000", "RestingState", None)
+    direct = EEGSubjectData(data_dir).get_task(*key).get_filtered_raw(1.0, 40.0)
+    subject_data = EEGSubjectData(data_dir, cache_dir=tmp_path, filter_mode=filter_mode, block_size=1000)
+    filtered = subject_data.get_task(*key).get_filtered_raw(1.0, 40.0)
+
+    assert filtered.first_samp == direct.first_samp
+    assert filtered.info["highpass"] == 1.0 and filtered.info["lowpass"] == 40.0
+    deviation = np.abs(filtered.get_data() - direct.get_data()).max() / np.abs(direct.get_data()).max()
+    assert deviation < BANDPASS_TOLERANCE
+
+
+@pytest.mark.parametrize("filter_mode", ["direct", "chunked"])
+def test_float32_mmap_filters_from_the_memmap(data_dir, tmp_path, filter_mode):
+    key = ("sub-NDARBENCH0000", "RestingState", None)
+    direct = EEGSubjectData(data_dir).get_task(*key).get_filtered_raw(1.0, 40.0)
+    task_data = EEGSubjectData(data_dir, cache_dir=tmp_path, mmap=True, precision="float32",
+                               filter_mode=filter_mode).get_task(*key)
+    task_data._ensure_loaded()
+
+    def reread(*args, **kwargs):
+        raise AssertionError("the .fdt was read again")
+    task_data._source.get_data = reread
+    filtered = task_data.get_filtered_raw(1.0, 40.0)
+
+    assert filtered._data.dtype == np.float32
+    deviation = np.abs(filtered.get_data() - direct.get_data()).max() / np.abs(direct.get_data()).max()
+    assert deviation < FLOAT32_TOLERANCE
@@ -0,0 +1,35 @@
+import mne
+import numpy as np
+from eegkit.cache import LRUCache
+from eegkit.store import raw_from_array
+from eegkit.windows import WindowedEpochs
+
+
+def _raw(n_channels=4, n_times=20000, sfreq=250.0):
+    info = mne.create_info([f"E{i}" for i in range(1, n_channels + 1)], sfreq, "eeg")
+    return mne.io.RawArray(np.random.default_rng(0).standard_normal((n_channels, n_times)), info, verbose=False)
+
+
+def _events(raw, step=500):
+    starts = np.arange(0, raw.n_times - step, step)
+    return np.column_stack([starts, np.zeros_like(starts), np.ones_like(starts)])
+
+
+def test_windowed_epochs_account_for_the_pinned_raw(tmp_path):
+    raw = _raw()
+    epochs = WindowedEpochs(raw, _events(raw), {"stim": 1}, 0.0, 1.0)
+    assert epochs.nbytes == raw._data.nbytes
+
+    cache = LRUCache(max_bytes=raw._data.nbytes * 3 // 2)
+    cache.put("filtered", raw)
+    cache.put("epochs", epochs)  # together over budget: the raw's own entry is evicted
+    assert "filtered" not in cache and "epochs" in cache
+    assert cache.nbytes == raw._data.nbytes  # ...but its buffer is still held, and counted
+
+
+def test_windowed_epochs_over_memmap_count_nothing(tmp_path):
+    raw = _raw()
+    np.save(tmp_path / "data.npy", raw._data)
+    mapped = raw_from_array(np.load(tmp_path / "data.npy", mmap_mode="r"), raw.info, raw)
+    epochs = WindowedEpochs(mapped, _events(mapped), {"stim": 1}, 0.0, 1.0)
+    assert epochs.nbytes == 0